@@ -0,0 +1,94 @@
+"""Throughput of N concurrent tool calls, blocking tools vs the async tools.
+
+Starts a local HTTP stub that answers every request after a fixed delay,
+points mcp_databricks at it and drives the FastMCP server through its
+in-memory client. The "blocking" server registers the same tool implemented
+the way the tools used to be (a synchronous HTTP call inside the tool), which
+holds the event loop for the whole round-trip.
+
+    python benchmarks/bench_concurrency.py --delay 0.2 --calls 1 8 32
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class SlowHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    delay = 0.0
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        time.sleep(self.delay)
+        body = json.dumps({"objects": [{"path": "/Users/bench/notebook", "object_type": "NOTEBOOK"}]}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def start_stub(delay: float) -> str:
+    SlowHandler.delay = delay
+    server = ThreadingHTTPServer(("127.0.0.1", 0), SlowHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return f"http://127.0.0.1:{server.server_port}"
+
+
+async def run(server, calls: int) -> float:
+    from fastmcp import Client
+
+    async with Client(server) as mcp_client:
+        start = time.perf_counter()
+        # A different path per call, so that the calls cannot share an upstream request
+        await asyncio.gather(*(
+            mcp_client.call_tool("list_workspace_objects", {"path": f"/Users/bench/{index}"})
+            for index in range(calls)
+        ))
+        return time.perf_counter() - start
+
+
+async def main(args):
+    os.environ["DATABRICKS_HOST"] = start_stub(args.delay)
+    os.environ.setdefault("DATABRICKS_TOKEN", "bench")
+    sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+    import httpx
+    from fastmcp import FastMCP
+    import mcp_databricks
+
+    # Measure concurrent upstream requests, not cache hits
+    for family in mcp_databricks.cache.ttls:
+        mcp_databricks.cache.ttls[family] = 0
+
+    blocking_client = httpx.Client(base_url=os.environ["DATABRICKS_HOST"])
+    blocking = FastMCP("databricks-blocking")
+
+    @blocking.tool
+    def list_workspace_objects(path: str) -> str:
+        response = blocking_client.get("/api/2.0/workspace/list", params={"path": path})
+        return response.text
+
+    print(f"upstream delay {args.delay * 1000:.0f} ms")
+    print(f"{'calls':>6} {'blocking req/s':>15} {'async req/s':>12} {'speedup':>8}")
+    for calls in args.calls:
+        blocking_elapsed = await run(blocking, calls)
+        async_elapsed = await run(mcp_databricks.mcp, calls)
+        print(
+            f"{calls:>6} {calls / blocking_elapsed:>15.1f} {calls / async_elapsed:>12.1f}"
+            f" {blocking_elapsed / async_elapsed:>7.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--delay", type=float, default=0.2, help="upstream latency in seconds")
+    parser.add_argument("--calls", type=int, nargs="+", default=[1, 8, 32], help="concurrent tool calls")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,69 @@
+"""Cold-start time and tools/list size of the server for different DATABRICKS_TOOL_TAGS.
+
+Each run imports mcp_databricks in a fresh interpreter, after fastmcp itself is
+imported so that only the server module (tool generation and registration) is
+timed, then lists the tools through the in-memory client and measures the
+JSON size of the result.
+
+    python benchmarks/bench_startup.py --runs 10 --tags "" secret,repos secret
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+here = os.path.dirname(os.path.abspath(__file__))
+
+probe = """
+import asyncio, json, sys, time
+import fastmcp
+start = time.perf_counter()
+import mcp_databricks
+imported = time.perf_counter() - start
+
+async def list_tools():
+    async with fastmcp.Client(mcp_databricks.mcp) as mcp_client:
+        start = time.perf_counter()
+        tools = await mcp_client.list_tools()
+        elapsed = time.perf_counter() - start
+    payload = json.dumps([tool.model_dump(mode="json", exclude_none=True) for tool in tools])
+    return len(tools), len(payload), elapsed
+
+tools, payload_bytes, listed = asyncio.run(list_tools())
+print(json.dumps({"import_s": imported, "list_s": listed, "tools": tools, "payload_bytes": payload_bytes}))
+"""
+
+
+def run_probe(tags: str) -> dict:
+    env = {
+        **os.environ,
+        "DATABRICKS_HOST": os.environ.get("DATABRICKS_HOST", "http://127.0.0.1:1"),
+        "DATABRICKS_TOKEN": os.environ.get("DATABRICKS_TOKEN", "bench"),
+        "DATABRICKS_TOOL_TAGS": tags,
+        "PYTHONPATH": os.pathsep.join(filter(None, [os.path.dirname(here), os.environ.get("PYTHONPATH")])),
+        "PYTHONWARNINGS": "ignore",
+    }
+    output = subprocess.run([sys.executable, "-c", probe], env=env, capture_output=True, text=True, check=True).stdout
+    return json.loads(output.splitlines()[-1])
+
+
+def main(args: argparse.Namespace) -> None:
+    print(f"{'tags':<20} {'tools':>6} {'import ms':>10} {'tools/list ms':>14} {'tools/list bytes':>17}")
+    for tags in args.tags:
+        runs = [run_probe(tags) for _ in range(args.runs)]
+        print(
+            f"{tags or '(all)':<20} {runs[0]['tools']:>6}"
+            f" {statistics.median(run['import_s'] for run in runs) * 1000:>10.1f}"
+            f" {statistics.median(run['list_s'] for run in runs) * 1000:>14.1f}"
+            f" {runs[0]['payload_bytes']:>17}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5, help="fresh interpreters per tag set, the median is reported")
+    parser.add_argument("--tags", nargs="+", default=["", "secret,repos", "secret"],
+                        help="DATABRICKS_TOOL_TAGS values to compare, an empty string enables every tool")
+    main(parser.parse_args())
@@ -0,0 +1,490 @@
+"""Local stand-in for the Databricks REST endpoints used by mcp_databricks.
+
+Serves repos, workspace, secrets, permissions, cluster policies and Git
+credentials from in-memory state, with configurable latency, page size,
+notebook payload size and injected 429 responses.
+
+    python benchmarks/mock_databricks.py --port 8765 --latency 0.05 --rate-429 0.01
+"""
+import argparse
+import asyncio
+import base64
+import json
+import random
+import time
+
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse, Response
+from starlette.routing import Route
+
+
+class MockDatabricks:
+    """In-memory workspace: a directory tree of notebooks, repos, secret scopes and cluster policies"""
+
+    def __init__(
+        self,
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        page_size: int = 100,
+        payload_bytes: int = 1024,
+        rate_429: float = 0.0,
+        retry_after: float = 0.1,
+        tree_depth: int = 3,
+        tree_width: int = 4,
+        notebooks_per_directory: int = 5,
+        repos: int = 250,
+        scopes: int = 20,
+        secrets_per_scope: int = 10,
+        policies: int = 20,
+    ):
+        self.latency = latency
+        self.jitter = jitter
+        self.page_size = page_size
+        self.rate_429 = rate_429
+        self.retry_after = retry_after
+        self.objects = {"/": {"path": "/", "object_type": "DIRECTORY", "object_id": 0}}
+        self.contents = {}
+        self.acls = {}
+        self.next_id = 1
+        content = (b"# Databricks notebook source\n" + b"x" * payload_bytes)[:max(payload_bytes, 1)]
+
+        def add_tree(path: str, depth: int) -> None:
+            self.add_object(path, "DIRECTORY")
+            for index in range(notebooks_per_directory):
+                self.add_object(f"{path}/notebook_{index}", "NOTEBOOK", "PYTHON", content)
+            if depth < tree_depth:
+                for index in range(tree_width):
+                    add_tree(f"{path}/folder_{index}", depth + 1)
+
+        add_tree("/Users", 1)
+        self.add_object("/Repos", "DIRECTORY")
+        self.repos = {}
+        for index in range(repos):
+            repo_id = self.next_id
+            path = f"/Repos/bench/repo_{index}"
+            self.repos[repo_id] = {
+                "id": repo_id,
+                "path": path,
+                "url": f"https://github.com/bench/repo_{index}.git",
+                "provider": "gitHub",
+                "branch": "main",
+                "head_commit_id": "0" * 40,
+            }
+            self.add_object(path, "REPO")
+        self.scopes = {
+            f"scope_{index}": {
+                "keys": {f"key_{key}": 1_700_000_000_000 + key for key in range(secrets_per_scope)},
+                "acls": {"admins": "MANAGE", f"team_{index}": "READ"},
+            }
+            for index in range(scopes)
+        }
+        self.policies = {
+            f"{index:016X}": {
+                "policy_id": f"{index:016X}",
+                "name": f"policy_{index}",
+                "definition": json.dumps({
+                    "spark_version": {"type": "fixed", "value": "15.4.x-scala2.12"},
+                    "autotermination_minutes": {"type": "range", "minValue": 10, "maxValue": 120},
+                    "node_type_id": {"type": "allowlist", "values": ["m5.large", "m5.xlarge"]},
+                    "custom_tags.team": {"type": "fixed", "value": f"team_{index}"},
+                }),
+                "created_at_timestamp": 1_700_000_000_000 + index,
+            }
+            for index in range(policies)
+        }
+        self.git_credentials = {}
+
+    def add_object(self, path: str, object_type: str, language: str | None = None, content: bytes | None = None) -> dict:
+        parent = path.rsplit("/", 1)[0] or "/"
+        if parent not in self.objects:
+            self.add_object(parent, "DIRECTORY")
+        obj = self.objects.get(path) or {"path": path, "object_id": self.next_id}
+        self.next_id += 1
+        obj["object_type"] = object_type
+        if language is not None:
+            obj["language"] = language
+        if object_type in ("NOTEBOOK", "FILE"):
+            obj["modified_at"] = int(time.time() * 1000)
+            self.contents[path] = content or b""
+        self.objects[path] = obj
+        return obj
+
+    def children(self, path: str) -> list[dict]:
+        prefix = path.rstrip("/") + "/"
+        return [
+            obj for child, obj in self.objects.items()
+            if child.startswith(prefix) and "/" not in child[len(prefix):] and child != path
+        ]
+
+    async def throttle(self) -> Response | None:
+        delay = self.latency + random.uniform(0, self.jitter)
+        if delay:
+            await asyncio.sleep(delay)
+        if self.rate_429 and random.random() < self.rate_429:
+            return JSONResponse(
+                {"error_code": "REQUEST_LIMIT_EXCEEDED", "message": "Injected rate limit"},
+                status_code=429,
+                headers={"Retry-After": str(self.retry_after)},
+            )
+        return None
+
+
+def error(status_code: int, error_code: str, message: str) -> JSONResponse:
+    return JSONResponse({"error_code": error_code, "message": message}, status_code=status_code)
+
+
+async def arguments(request: Request) -> dict:
+    """Query params merged with a JSON or multipart body, as the real API accepts both"""
+    values = dict(request.query_params)
+    content_type = request.headers.get("content-type", "")
+    if content_type.startswith("multipart/form-data"):
+        form = await request.form()
+        for key, value in form.items():
+            values[key] = await value.read() if hasattr(value, "read") else value
+    else:
+        body = await request.body()
+        if body:
+            values.update(json.loads(body))
+    return values
+
+
+def create_app(mock: MockDatabricks) -> Starlette:
+    async def handle(request: Request) -> Response:
+        throttled = await mock.throttle()
+        if throttled is not None:
+            return throttled
+        path = "/" + request.path_params["path"]
+        handler = handlers.get((request.method, path))
+        if handler is None:
+            for (method, prefix), prefix_handler in prefix_handlers.items():
+                if method == request.method and path.startswith(prefix):
+                    return await prefix_handler(request, path[len(prefix):])
+            return error(404, "ENDPOINT_NOT_FOUND", f"No API found for '{request.method} {path}'")
+        return await handler(request)
+
+    async def list_repos(request: Request) -> Response:
+        args = await arguments(request)
+        repos = [repo for repo in mock.repos.values() if repo["path"].startswith(args.get("path_prefix", ""))]
+        start = int(args.get("next_page_token") or 0)
+        page = {"repos": repos[start:start + mock.page_size]}
+        if start + mock.page_size < len(repos):
+            page["next_page_token"] = str(start + mock.page_size)
+        return JSONResponse(page)
+
+    async def create_repo(request: Request) -> Response:
+        args = await arguments(request)
+        obj = mock.add_object(args.get("path") or f"/Repos/bench/{args['url'].rsplit('/', 1)[-1]}", "REPO")
+        repo = {"id": obj["object_id"], "path": obj["path"], "url": args["url"], "provider": args["provider"], "branch": "main"}
+        mock.repos[repo["id"]] = repo
+        return JSONResponse(repo)
+
+    async def repo(request: Request, repo_id: str) -> Response:
+        repo = mock.repos.get(int(repo_id)) if repo_id.isdigit() else None
+        if repo is None:
+            return error(404, "RESOURCE_DOES_NOT_EXIST", f"Repo {repo_id} does not exist")
+        if request.method == "PATCH":
+            args = await arguments(request)
+            repo.update({key: args[key] for key in ("branch", "tag") if args.get(key)})
+        elif request.method == "DELETE":
+            del mock.repos[repo["id"]]
+            mock.objects.pop(repo["path"], None)
+            return JSONResponse({})
+        return JSONResponse(repo)
+
+    async def workspace_list(request: Request) -> Response:
+        args = await arguments(request)
+        path = args.get("path", "/")
+        if mock.objects.get(path, {}).get("object_type") not in ("DIRECTORY", "REPO"):
+            return error(404, "RESOURCE_DOES_NOT_EXIST", f"Path ({path}) doesn't exist.")
+        modified_after = int(args.get("notebooks_modified_after") or 0)
+        objects = [
+            obj for obj in mock.children(path)
+            if obj["object_type"] != "NOTEBOOK" or obj["modified_at"] > modified_after
+        ]
+        return JSONResponse({"objects": objects} if objects else {})
+
+    async def workspace_get_status(request: Request) -> Response:
+        path = (await arguments(request)).get("path", "")
+        if path not in mock.objects:
+            return error(404, "RESOURCE_DOES_NOT_EXIST", f"Path ({path}) doesn't exist.")
+        return JSONResponse(mock.objects[path])
+
+    async def workspace_export(request: Request) -> Response:
+        args = await arguments(request)
+        path = args.get("path", "")
+        if path not in mock.contents:
+            return error(404, "RESOURCE_DOES_NOT_EXIST", f"Path ({path}) doesn't exist.")
+        if str(args.get("direct_download")).lower() == "true":
+            return Response(mock.contents[path], media_type="application/octet-stream")
+        return JSONResponse({"content": base64.b64encode(mock.contents[path]).decode(), "file_type": "py"})
+
+    async def workspace_import(request: Request) -> Response:
+        args = await arguments(request)
+        content = args.get("content") or b""
+        if isinstance(content, str):
+            content = base64.b64decode(content)
+        path = args["path"]
+        if path in mock.objects and str(args.get("overwrite")).lower() != "true":
+            return error(400, "RESOURCE_ALREADY_EXISTS", f"Path ({path}) already exists.")
+        object_type = "FILE" if args.get("format") == "AUTO" else "NOTEBOOK"
+        mock.add_object(path, object_type, args.get("language"), content)
+        return JSONResponse({})
+
+    async def workspace_mkdirs(request: Request) -> Response:
+        path = (await arguments(request))["path"]
+        if path not in mock.objects:
+            mock.add_object(path, "DIRECTORY")
+        return JSONResponse({})
+
+    async def workspace_delete(request: Request) -> Response:
+        args = await arguments(request)
+        path = args["path"]
+        if path not in mock.objects:
+            return error(404, "RESOURCE_DOES_NOT_EXIST", f"Path ({path}) doesn't exist.")
+        for child in [child for child in mock.objects if child == path or child.startswith(path + "/")]:
+            mock.objects.pop(child)
+            mock.contents.pop(child, None)
+        return JSONResponse({})
+
+    def scope_of(args: dict) -> dict | None:
+        return mock.scopes.get(args.get("scope", ""))
+
+    async def scopes_list(request: Request) -> Response:
+        return JSONResponse({"scopes": [{"name": name, "backend_type": "DATABRICKS"} for name in mock.scopes]})
+
+    async def scopes_create(request: Request) -> Response:
+        args = await arguments(request)
+        if args["scope"] in mock.scopes:
+            return error(400, "RESOURCE_ALREADY_EXISTS", f"Scope {args['scope']} already exists!")
+        mock.scopes[args["scope"]] = {"keys": {}, "acls": {args.get("initial_manage_principal") or "bench@example.com": "MANAGE"}}
+        return JSONResponse({})
+
+    async def scopes_delete(request: Request) -> Response:
+        args = await arguments(request)
+        if mock.scopes.pop(args["scope"], None) is None:
+            return error(404, "RESOURCE_DOES_NOT_EXIST", f"Scope {args['scope']} does not exist!")
+        return JSONResponse({})
+
+    async def secrets_list(request: Request) -> Response:
+        scope = scope_of(await arguments(request))
+        if scope is None:
+            return error(404, "RESOURCE_DOES_NOT_EXIST", "Scope does not exist!")
+        secrets = [{"key": key, "last_updated_timestamp": updated} for key, updated in scope["keys"].items()]
+        return JSONResponse({"secrets": secrets} if secrets else {})
+
+    async def secrets_put(request: Request) -> Response:
+        args = await arguments(request)
+        scope = scope_of(args)
+        if scope is None:
+            return error(404, "RESOURCE_DOES_NOT_EXIST", "Scope does not exist!")
+        scope["keys"][args["key"]] = int(time.time() * 1000)
+        return JSONResponse({})
+
+    async def secrets_get(request: Request) -> Response:
+        args = await arguments(request)
+        scope = scope_of(args)
+        if scope is None or args.get("key") not in scope["keys"]:
+            return error(404, "RESOURCE_DOES_NOT_EXIST", "Secret does not exist!")
+        return JSONResponse({"key": args["key"], "value": base64.b64encode(b"secret").decode()})
+
+    async def secrets_delete(request: Request) -> Response:
+        args = await arguments(request)
+        scope = scope_of(args)
+        if scope is None or scope["keys"].pop(args.get("key"), None) is None:
+            return error(404, "RESOURCE_DOES_NOT_EXIST", "Secret does not exist!")
+        return JSONResponse({})
+
+    async def acls_list(request: Request) -> Response:
+        scope = scope_of(await arguments(request))
+        if scope is None:
+            return error(404, "RESOURCE_DOES_NOT_EXIST", "Scope does not exist!")
+        return JSONResponse({"items": [{"principal": principal, "permission": permission} for principal, permission in scope["acls"].items()]})
+
+    async def acls_get(request: Request) -> Response:
+        args = await arguments(request)
+        scope = scope_of(args)
+        if scope is None or args.get("principal") not in scope["acls"]:
+            return error(404, "RESOURCE_DOES_NOT_EXIST", "ACL does not exist!")
+        return JSONResponse({"principal": args["principal"], "permission": scope["acls"][args["principal"]]})
+
+    async def acls_set(request: Request) -> Response:
+        args = await arguments(request)
+        scope = scope_of(args)
+        if scope is None:
+            return error(404, "RESOURCE_DOES_NOT_EXIST", "Scope does not exist!")
+        scope["acls"][args["principal"]] = args["permission"]
+        return JSONResponse({})
+
+    async def acls_delete(request: Request) -> Response:
+        args = await arguments(request)
+        scope = scope_of(args)
+        if scope is None or scope["acls"].pop(args.get("principal"), None) is None:
+            return error(404, "RESOURCE_DOES_NOT_EXIST", "ACL does not exist!")
+        return JSONResponse({})
+
+    async def permissions(request: Request, rest: str) -> Response:
+        if rest.endswith("/permissionLevels"):
+            levels = ["CAN_MANAGE", "CAN_USE"] if rest.startswith("cluster-policies/") else ["CAN_READ", "CAN_RUN", "CAN_EDIT", "CAN_MANAGE"]
+            return JSONResponse({"permission_levels": [{"permission_level": level} for level in levels]})
+        acl = mock.acls.setdefault(rest, {("group_name", "admins"): ("CAN_MANAGE", True)})
+        if request.method in ("PUT", "PATCH"):
+            args = await arguments(request)
+            if request.method == "PUT":
+                for principal in [principal for principal, (_, inherited) in acl.items() if not inherited]:
+                    del acl[principal]
+            for entry in args.get("access_control_list") or []:
+                for key in ("user_name", "group_name", "service_principal_name"):
+                    if entry.get(key):
+                        acl[(key, entry[key])] = (entry["permission_level"], False)
+        object_type, _, object_id = rest.partition("/")
+        return JSONResponse({
+            "object_id": f"/{object_type}/{object_id}",
+            "object_type": object_type.rstrip("s"),
+            "access_control_list": [
+                {key: name, "all_permissions": [{"permission_level": level, "inherited": inherited}]}
+                for (key, name), (level, inherited) in acl.items()
+            ],
+        })
+
+    async def policies_list(request: Request) -> Response:
+        args = await arguments(request)
+        policies = list(mock.policies.values())
+        if args.get("sort_column") == "POLICY_NAME":
+            policies.sort(key=lambda policy: policy["name"])
+        if args.get("sort_order") == "DESC":
+            policies.reverse()
+        return JSONResponse({"policies": policies, "total_count": len(policies)})
+
+    async def policies_get(request: Request) -> Response:
+        policy = mock.policies.get((await arguments(request)).get("policy_id", ""))
+        if policy is None:
+            return error(404, "RESOURCE_DOES_NOT_EXIST", "Policy does not exist")
+        return JSONResponse(policy)
+
+    async def policies_create(request: Request) -> Response:
+        args = await arguments(request)
+        policy_id = f"{mock.next_id:016X}"
+        mock.next_id += 1
+        definition = args.get("definition")
+        mock.policies[policy_id] = {
+            "policy_id": policy_id,
+            "name": args["name"],
+            "definition": definition if isinstance(definition, str) else json.dumps(definition or {}),
+            "created_at_timestamp": int(time.time() * 1000),
+        }
+        return JSONResponse({"policy_id": policy_id})
+
+    async def policies_edit(request: Request) -> Response:
+        args = await arguments(request)
+        policy = mock.policies.get(args.get("policy_id", ""))
+        if policy is None:
+            return error(404, "RESOURCE_DOES_NOT_EXIST", "Policy does not exist")
+        for key in ("name", "description", "max_clusters_per_user"):
+            if args.get(key) is not None:
+                policy[key] = args[key]
+        if args.get("definition") is not None:
+            policy["definition"] = args["definition"] if isinstance(args["definition"], str) else json.dumps(args["definition"])
+        return JSONResponse({})
+
+    async def policies_delete(request: Request) -> Response:
+        if mock.policies.pop((await arguments(request)).get("policy_id", ""), None) is None:
+            return error(404, "RESOURCE_DOES_NOT_EXIST", "Policy does not exist")
+        return JSONResponse({})
+
+    async def git_credentials(request: Request) -> Response:
+        if request.method == "GET":
+            return JSONResponse({"credentials": list(mock.git_credentials.values())})
+        args = await arguments(request)
+        credential = {"credential_id": mock.next_id, "git_provider": args["git_provider"], "git_username": args.get("git_username")}
+        mock.next_id += 1
+        mock.git_credentials[credential["credential_id"]] = credential
+        return JSONResponse(credential)
+
+    async def git_credential(request: Request, credential_id: str) -> Response:
+        credential = mock.git_credentials.get(int(credential_id)) if credential_id.isdigit() else None
+        if credential is None:
+            return error(404, "RESOURCE_DOES_NOT_EXIST", f"Credential {credential_id} does not exist")
+        if request.method == "DELETE":
+            del mock.git_credentials[credential["credential_id"]]
+            return JSONResponse({})
+        if request.method == "PATCH":
+            credential.update({key: value for key, value in (await arguments(request)).items() if value is not None})
+        return JSONResponse(credential)
+
+    handlers = {
+        ("GET", "/api/2.0/repos"): list_repos,
+        ("POST", "/api/2.0/repos"): create_repo,
+        ("GET", "/api/2.0/workspace/list"): workspace_list,
+        ("GET", "/api/2.0/workspace/get-status"): workspace_get_status,
+        ("GET", "/api/2.0/workspace/export"): workspace_export,
+        ("POST", "/api/2.0/workspace/import"): workspace_import,
+        ("POST", "/api/2.0/workspace/mkdirs"): workspace_mkdirs,
+        ("POST", "/api/2.0/workspace/delete"): workspace_delete,
+        ("GET", "/api/2.0/secrets/scopes/list"): scopes_list,
+        ("POST", "/api/2.0/secrets/scopes/create"): scopes_create,
+        ("POST", "/api/2.0/secrets/scopes/delete"): scopes_delete,
+        ("GET", "/api/2.0/secrets/list"): secrets_list,
+        ("POST", "/api/2.0/secrets/put"): secrets_put,
+        ("GET", "/api/2.0/secrets/get"): secrets_get,
+        ("POST", "/api/2.0/secrets/delete"): secrets_delete,
+        ("GET", "/api/2.0/secrets/acls/list"): acls_list,
+        ("GET", "/api/2.0/secrets/acls/get"): acls_get,
+        ("POST", "/api/2.0/secrets/acls/set"): acls_set,
+        ("POST", "/api/2.0/secrets/acls/delete"): acls_delete,
+        ("GET", "/api/2.0/policies/clusters/list"): policies_list,
+        ("GET", "/api/2.0/policies/clusters/get"): policies_get,
+        ("POST", "/api/2.0/policies/clusters/create"): policies_create,
+        ("POST", "/api/2.0/policies/clusters/edit"): policies_edit,
+        ("POST", "/api/2.0/policies/clusters/delete"): policies_delete,
+        ("GET", "/api/2.0/git-credentials"): git_credentials,
+        ("POST", "/api/2.0/git-credentials"): git_credentials,
+    }
+    prefix_handlers = {
+        (method, "/api/2.0/repos/"): repo for method in ("GET", "PATCH", "DELETE")
+    } | {
+        (method, "/api/2.0/permissions/"): permissions for method in ("GET", "PUT", "PATCH")
+    } | {
+        (method, "/api/2.0/git-credentials/"): git_credential for method in ("GET", "PATCH", "DELETE")
+    }
+
+    return Starlette(routes=[Route("/{path:path}", handle, methods=["GET", "POST", "PUT", "PATCH", "DELETE"])])
+
+
+def parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds added to every response")
+    parser.add_argument("--jitter", type=float, default=0.0, help="random extra latency of up to this many seconds")
+    parser.add_argument("--page-size", type=int, default=100, help="repos per page")
+    parser.add_argument("--payload-bytes", type=int, default=1024, help="size of every notebook")
+    parser.add_argument("--rate-429", type=float, default=0.0, help="fraction of requests answered with a 429")
+    parser.add_argument("--retry-after", type=float, default=0.1, help="Retry-After of injected 429s in seconds")
+    parser.add_argument("--tree-depth", type=int, default=3, help="directory depth below /Users")
+    parser.add_argument("--tree-width", type=int, default=4, help="subdirectories per directory")
+    parser.add_argument("--repos", type=int, default=250)
+    parser.add_argument("--scopes", type=int, default=20)
+    return parser
+
+
+def from_args(args: argparse.Namespace) -> MockDatabricks:
+    return MockDatabricks(
+        latency=args.latency,
+        jitter=args.jitter,
+        page_size=args.page_size,
+        payload_bytes=args.payload_bytes,
+        rate_429=args.rate_429,
+        retry_after=args.retry_after,
+        tree_depth=args.tree_depth,
+        tree_width=args.tree_width,
+        repos=args.repos,
+        scopes=args.scopes,
+    )
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    args = parser().parse_args()
+    uvicorn.run(create_app(from_args(args)), host=args.host, port=args.port, log_level="warning")
@@ -0,0 +1,201 @@
+"""Benchmark the MCP tools against the local mock Databricks server.
+
+Starts benchmarks/mock_databricks.py in a subprocess, points mcp_databricks
+at it and drives the FastMCP server through its in-memory client with N
+concurrent callers per tool. Reports p50/p99 latency, throughput and the
+RSS sampled while each tool runs: its peak, and how far it rose above the RSS
+at the start of that tool. The upstream column counts the requests sent to the
+mock, which is below the number of calls when identical calls are coalesced.
+
+    python benchmarks/run_benchmarks.py --concurrency 16 --calls 200 --latency 0.05
+    python benchmarks/run_benchmarks.py --tools get_repos list_scopes --rate-429 0.05
+"""
+import argparse
+import asyncio
+import gc
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import urllib.request
+
+# Optional, without it the RSS is read from /proc (Linux only)
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+here = os.path.dirname(os.path.abspath(__file__))
+
+# Arguments of the call with the given index. They differ between calls where the API allows it,
+# so that with the cache off each call is its own upstream request rather than being coalesced.
+# list_scopes, list_cluster_policies and get_secret_inventory take no such argument.
+scenarios = {
+    "list_scopes": lambda index, tree: {},
+    "list_secrets": lambda index, tree: {"scope": f"scope_{index % tree['scopes']}"},
+    "get_repos": lambda index, tree: {"path_prefix": f"/Repos/bench/repo_{index % tree['repos']}"},
+    "get_repo": lambda index, tree: {"repo_id": tree["repo_ids"][index % len(tree["repo_ids"])]},
+    "get_object_status": lambda index, tree: {"path": tree["notebooks"][index % len(tree["notebooks"])]},
+    "list_workspace_objects": lambda index, tree: {"path": tree["directories"][index % len(tree["directories"])]},
+    "list_workspace_objects_recursive": lambda index, tree: {"path": tree["directories"][index % len(tree["directories"])]},
+    "export_workspace_object": lambda index, tree: {"path": tree["notebooks"][index % len(tree["notebooks"])]},
+    "get_workspace_object_permission": lambda index, tree: {"workspace_object_type": "notebooks", "workspace_object_id": str(index)},
+    "list_cluster_policies": lambda index, tree: {},
+    "get_cluster_policy": lambda index, tree: {"policy_id": f"{index % 20:016X}"},
+    "get_secret_inventory": lambda index, tree: {},
+}
+
+
+def mock_tree(args: argparse.Namespace) -> dict:
+    """Paths of the directories and notebooks the mock server creates below /Users"""
+    directories = ["/Users"]
+    level = ["/Users"]
+    for _ in range(args.tree_depth - 1):
+        level = [f"{path}/folder_{index}" for path in level for index in range(args.tree_width)]
+        directories.extend(level)
+    notebooks = [f"{path}/notebook_{index}" for path in directories for index in range(5)]
+    return {"directories": directories, "notebooks": notebooks, "repos": args.repos, "scopes": args.scopes}
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_mock(args: argparse.Namespace) -> tuple[subprocess.Popen, str]:
+    port = free_port()
+    command = [
+        sys.executable, os.path.join(here, "mock_databricks.py"),
+        "--port", str(port),
+        "--latency", str(args.latency),
+        "--jitter", str(args.jitter),
+        "--page-size", str(args.page_size),
+        "--payload-bytes", str(args.payload_bytes),
+        "--rate-429", str(args.rate_429),
+        "--tree-depth", str(args.tree_depth),
+        "--tree-width", str(args.tree_width),
+        "--scopes", str(args.scopes),
+        "--repos", str(args.repos),
+    ]
+    process = subprocess.Popen(command)
+    host = f"http://127.0.0.1:{port}"
+    deadline = time.monotonic() + 30
+    while True:
+        try:
+            urllib.request.urlopen(host + "/api/2.0/secrets/scopes/list", timeout=1)
+            return process, host
+        except OSError:
+            if process.poll() is not None or time.monotonic() > deadline:
+                process.kill()
+                raise RuntimeError("mock Databricks server did not start")
+            time.sleep(0.1)
+
+
+def rss_mb() -> float:
+    """Current resident set size of this process, with psutil if it is installed or from /proc"""
+    if psutil is not None:
+        return psutil.Process().memory_info().rss / 2 ** 20
+    with open("/proc/self/statm") as statm:
+        return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2 ** 20
+
+
+async def sample_rss(samples: list, interval: float = 0.005) -> None:
+    while True:
+        samples.append(rss_mb())
+        await asyncio.sleep(interval)
+
+
+async def bench_tool(mcp_client, pool_stats: dict, name: str, tree: dict, calls: int, concurrency: int) -> dict:
+    latencies = []
+    errors = 0
+    remaining = iter(range(calls))
+    requests = pool_stats["requests"]
+
+    async def caller() -> None:
+        nonlocal errors
+        for index in remaining:
+            start = time.perf_counter()
+            result = await mcp_client.call_tool(name, scenarios[name](index, tree), raise_on_error=False)
+            latencies.append(time.perf_counter() - start)
+            errors += result.is_error
+
+    gc.collect()
+    rss = [rss_mb()]
+    sampling = asyncio.create_task(sample_rss(rss))
+    start = time.perf_counter()
+    try:
+        await asyncio.gather(*(caller() for _ in range(concurrency)))
+    finally:
+        sampling.cancel()
+    elapsed = time.perf_counter() - start
+    rss.append(rss_mb())
+    quantiles = statistics.quantiles(latencies, n=100) if len(latencies) > 1 else latencies * 99
+    return {
+        "tool": name,
+        "calls": calls,
+        "errors": errors,
+        "upstream_requests": pool_stats["requests"] - requests,
+        "p50_ms": quantiles[49] * 1000,
+        "p99_ms": quantiles[98] * 1000,
+        "throughput": calls / elapsed,
+        "peak_rss_mb": max(rss),
+        "rss_growth_mb": max(rss) - rss[0],
+    }
+
+
+async def main(args: argparse.Namespace) -> None:
+    process, host = start_mock(args)
+    try:
+        os.environ["DATABRICKS_HOST"] = host
+        os.environ["DATABRICKS_TOKEN"] = "bench"
+        sys.path.insert(0, os.path.dirname(here))
+        from fastmcp import Client
+        import mcp_databricks
+
+        if not args.cache:
+            # A TTL of 0 disables caching, for every family the server knows
+            for family in mcp_databricks.cache.ttls:
+                mcp_databricks.cache.ttls[family] = 0
+        tree = mock_tree(args)
+        names = args.tools or list(scenarios)
+        results = []
+        async with Client(mcp_databricks.mcp) as mcp_client:
+            repos = json.loads((await mcp_client.call_tool("get_repos", {"limit": args.repos})).content[0].text)
+            tree["repo_ids"] = [str(repo["id"]) for repo in repos["repos"]]
+            for name in names:
+                results.append(await bench_tool(mcp_client, mcp_databricks.pool_stats, name, tree, args.calls, args.concurrency))
+        if args.json:
+            print(json.dumps(results, indent=2))
+            return
+        print(f"latency {args.latency * 1000:.0f} ms, {args.concurrency} concurrent callers, {args.calls} calls per tool,"
+              f" cache {'on' if args.cache else 'off'}, 429 rate {args.rate_429:.0%}")
+        print(f"{'tool':<34} {'p50 ms':>8} {'p99 ms':>8} {'calls/s':>9} {'upstream':>9} {'errors':>7} {'peak RSS MB':>12} {'RSS +MB':>8}")
+        for result in results:
+            print(f"{result['tool']:<34} {result['p50_ms']:>8.1f} {result['p99_ms']:>8.1f} {result['throughput']:>9.1f}"
+                  f" {result['upstream_requests']:>9} {result['errors']:>7} {result['peak_rss_mb']:>12.1f} {result['rss_growth_mb']:>8.1f}")
+    finally:
+        process.terminate()
+        process.wait()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--tools", nargs="+", choices=sorted(scenarios), help="tools to benchmark, all by default")
+    parser.add_argument("--calls", type=int, default=100, help="calls per tool")
+    parser.add_argument("--concurrency", type=int, default=16, help="concurrent callers")
+    parser.add_argument("--cache", action="store_true", help="keep the response cache enabled")
+    parser.add_argument("--json", action="store_true", help="print the results as JSON")
+    parser.add_argument("--latency", type=float, default=0.02, help="mock server latency in seconds")
+    parser.add_argument("--jitter", type=float, default=0.0, help="mock server latency jitter in seconds")
+    parser.add_argument("--page-size", type=int, default=100, help="mock server repos per page")
+    parser.add_argument("--payload-bytes", type=int, default=1024, help="mock server notebook size")
+    parser.add_argument("--rate-429", type=float, default=0.0, help="fraction of mock responses that are 429")
+    parser.add_argument("--tree-depth", type=int, default=3, help="mock workspace directory depth")
+    parser.add_argument("--tree-width", type=int, default=4, help="mock workspace subdirectories per directory")
+    parser.add_argument("--scopes", type=int, default=20, help="mock workspace secret scopes")
+    parser.add_argument("--repos", type=int, default=250, help="mock workspace repos")
+    asyncio.run(main(parser.parse_args()))
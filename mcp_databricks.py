@@ -1,537 +1,2154 @@
+import asyncio
+import base64
+from bisect import bisect_left
+from collections import OrderedDict, defaultdict, deque
+from contextlib import aclosing, asynccontextmanager, contextmanager
+from contextvars import ContextVar
+from email.utils import parsedate_to_datetime
+from functools import lru_cache
+import hashlib
+import hmac
+import importlib.util
+import inspect
+import ipaddress
+import json
 import os
-from typing import Annotated, List, Literal, Optional
+import random
+import re
+import sqlite3
+import string
+import time
+from urllib.parse import urlsplit
+from typing import Annotated, Any, AsyncIterator, Awaitable, Callable, Iterator, List, Literal, Optional, get_type_hints
 
-from fastmcp import FastMCP
-from pydantic import BaseModel
-import requests
+from fastmcp import Context, FastMCP
+from fastmcp.server.auth import AccessToken, TokenVerifier
+from fastmcp.server.middleware import Middleware, MiddlewareContext
+import httpx
+from pydantic import BaseModel, Field
+from pydantic_core import to_jsonable_python
+from sse_starlette.sse import AppStatus
+from starlette.requests import Request
+from starlette.responses import PlainTextResponse
+import uvicorn
 
 databricks_host = os.environ["DATABRICKS_HOST"]
 databricks_token = os.environ["DATABRICKS_TOKEN"]
 
-headers = {"Authorization": f"Bearer {databricks_token}"}
+pool_size = int(os.environ.get("DATABRICKS_POOL_SIZE", "10"))
+keepalive_expiry = float(os.environ.get("DATABRICKS_KEEPALIVE_EXPIRY", "60"))
+connect_timeout = float(os.environ.get("DATABRICKS_CONNECT_TIMEOUT", "10"))
+read_timeout = float(os.environ.get("DATABRICKS_READ_TIMEOUT", "60"))
+max_retries = int(os.environ.get("DATABRICKS_MAX_RETRIES", "3"))
+retry_backoff = float(os.environ.get("DATABRICKS_RETRY_BACKOFF", "0.5"))
+retry_max_backoff = float(os.environ.get("DATABRICKS_RETRY_MAX_BACKOFF", "30"))
+tool_tags = {tag for tag in os.environ.get("DATABRICKS_TOOL_TAGS", "").split(",") if tag}
+transport = os.environ.get("DATABRICKS_MCP_TRANSPORT", "stdio")
+server_host = os.environ.get("DATABRICKS_MCP_HOST", "127.0.0.1")
+server_port = int(os.environ.get("DATABRICKS_MCP_PORT", "8000"))
+server_token = os.environ.get("DATABRICKS_MCP_TOKEN")
+# Local files the tools may read and write, over HTTP they are refused unless this is set
+local_root = os.environ.get("DATABRICKS_MCP_LOCAL_ROOT")
+client_concurrency = int(os.environ.get("DATABRICKS_CLIENT_CONCURRENCY", "8"))
+shutdown_timeout = float(os.environ.get("DATABRICKS_SHUTDOWN_TIMEOUT", "30"))
+export_max_bytes = int(os.environ.get("DATABRICKS_EXPORT_MAX_BYTES", str(1024 ** 3)))
+index_path = os.environ.get(
+    "DATABRICKS_INDEX_PATH",
+    os.path.join(os.path.expanduser("~"), ".cache", "mcp-databricks", f"{urlsplit(databricks_host).netloc or 'workspace'}.sqlite3"),
+)
+# HTTP/2 needs the optional h2 package (pip install httpx[http2])
+http2 = importlib.util.find_spec("h2") is not None
 
-mcp = FastMCP("databricks")
+pool_stats = {"requests": 0, "retries": 0, "coalesced": 0, "connections_opened": 0, "in_flight": 0, "peak_in_flight": 0}
 
-@mcp.tool(tags=["workspace", "databricks_workspace", "git_credentials"])
-def list_git_credentials() -> str:
-    """List the Git credentials"""
-    url = "/api/2.0/git-credentials"
-    response = requests.get(databricks_host + url, headers=headers)
-    return response.text
+async def trace(event_name: str, info: dict) -> None:
+    """Count the TCP connections the pool actually opens"""
+    if event_name == "connection.connect_tcp.complete":
+        pool_stats["connections_opened"] += 1
 
-@mcp.tool(tags=["workspace", "databricks_workspace", "git_credentials"])
-def create_git_credentials(
-    git_provider: Literal["gitHub", "bitbucketCloud", "gitLab", "azureDevOpsServices", "gitHubEnterprise", "bitbucketServer", "gitLabEnterpriseEdition", "awsCodeCommit"],
-    git_email: Annotated[str | None, "Optional, The authenticating email associated with your Git provider user account. Used for authentication with the remote repository and also sets the author & committer identity for commits. Required for most Git providers except AWS CodeCommit"] = None,
-    git_username: Annotated[str | None, "Optional. The Git username associated with the credential. Required for AWS CodeCommit"] = None,
-    is_default_for_provider: Annotated[bool | None, "Optional"] = None,
-    name: Annotated[str | None, "Optional"] = None,
-    personal_access_token: Annotated[str | None, "Optional"] = None,    
-    ) -> str:
-    """Create Git credentials"""
-    url = "/api/2.0/git-credentials"
-    data = {
-        "git_provider": git_provider,
-        "git_email": git_email,
-        "git_username": git_username,
-        "is_default_for_provider": is_default_for_provider,
-        "name": name,
-        "personal_access_token": personal_access_token,
-    }
-    response = requests.post(databricks_host + url, headers=headers, json=data)
-    return response.text
+@contextmanager
+def track_request() -> Iterator[None]:
+    pool_stats["requests"] += 1
+    pool_stats["in_flight"] += 1
+    pool_stats["peak_in_flight"] = max(pool_stats["peak_in_flight"], pool_stats["in_flight"])
+    try:
+        yield
+    finally:
+        pool_stats["in_flight"] -= 1
 
-@mcp.tool(tags=["workspace", "databricks_workspace", "git_credentials"])
-def get_git_credential(credential_id: int) -> str:
-    """Get a Git credential"""
-    url = f"/api/2.0/git-credentials/{credential_id}"
-    response = requests.get(databricks_host + url, headers=headers)
-    return response.text
+class Histogram:
+    """Latency histogram with fixed buckets, cheap enough to update on every request"""
 
-@mcp.tool(tags=["workspace", "databricks_workspace", "git_credentials"])
-def update_git_credential(
-    credential_id: int,
-    git_provider: Literal["gitHub", "bitbucketCloud", "gitLab", "azureDevOpsServices", "gitHubEnterprise", "bitbucketServer", "gitLabEnterpriseEdition", "awsCodeCommit"],
-    git_email: Annotated[str | None, "Optional. The authenticating email associated with your Git provider user account. Used for authentication with the remote repository and also sets the author & committer identity for commits. Required for most Git providers except AWS CodeCommit"] = None,
-    git_username: Annotated[str | None, "Optional. The Git username associated with the credential. Required for AWS CodeCommit"] = None,
-    is_default_for_provider: Annotated[bool | None, "Optional"] = None,
-    name: Annotated[str | None, "Optional"] = None,
-    personal_access_token: Annotated[str | None, "Optional"] = None,    
-    ) -> str:
-    """Update a Git credential"""
-    url = f"/api/2.0/git-credentials/{credential_id}"
-    data = {
-        "git_provider": git_provider,
-        "git_email": git_email,
-        "git_username": git_username,
-        "is_default_for_provider": is_default_for_provider,
-        "name": name,
-        "personal_access_token": personal_access_token,
-    }
-    response = requests.patch(databricks_host + url, headers=headers, json=data)
-    return response.text
+    buckets = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
 
-@mcp.tool(tags=["workspace", "databricks_workspace", "git_credentials"])
-def delete_git_credential(credential_id: int) -> str:
-    """Delete a Git credential"""
-    url = f"/api/2.0/git-credentials/{credential_id}"
-    response = requests.delete(databricks_host + url, headers=headers)
-    return response.text
+    def __init__(self):
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
 
-@mcp.tool(tags=["workspace", "databricks_workspace", "repos"])
-def get_repo_permissions(repo_id: str) -> str:
-    """Get repository permissions"""
-    url = f"/api/2.0/permissions/repos/{repo_id}"
-    response = requests.get(databricks_host + url, headers=headers)
-    return response.text
+    def observe(self, seconds: float) -> None:
+        self.counts[bisect_left(self.buckets, seconds)] += 1
+        self.count += 1
+        self.sum += seconds
 
-class AccessControlEntry(BaseModel):
-    group_name: Optional[str] = None
-    permission_level: Optional[Literal["CAN_MANAGE", "CAN_EDIT", "CAN_RUN", "CAN_READ"]] = None
-    service_principal_name: Optional[str] = None
-    user_name: Optional[str] = None
+    def quantile(self, q: float) -> float | None:
+        """Upper bound of the bucket holding the q-quantile"""
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(self.buckets, self.counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return float("inf")
 
-@mcp.tool(tags=["workspace", "databricks_workspace", "repos"])
-def set_repo_permissions(
-    repo_id: str,
-    access_control_list: Annotated[Optional[List[AccessControlEntry]] | None, "Optional. List of access control entries"] = None,
-    ) -> str:
-    """Set repository permissions"""
-    url = f"/api/2.0/permissions/repos/{repo_id}"
-    data = {"access_control_list": access_control_list}
-    response = requests.put(databricks_host + url, headers=headers, json=data)
-    return response.text
+    def summary(self) -> dict:
+        return {
+            "count": self.count,
+            "mean": self.sum / self.count if self.count else None,
+            "p50": self.quantile(0.5),
+            "p99": self.quantile(0.99),
+        }
 
-@mcp.tool(tags=["workspace", "databricks_workspace", "repos"])
-def update_repo_permissions(
-    repo_id: str,
-    access_control_list: Annotated[Optional[List[AccessControlEntry]] | None, "Optional. List of access control entries"] = None,
-    ) -> str:
-    """Update repository permissions"""
-    url = f"/api/2.0/permissions/repos/{repo_id}"
-    data = {"access_control_list": access_control_list}
-    response = requests.patch(databricks_host + url, headers=headers, json=data)
-    return response.text
+class Metrics:
+    """Per-tool and per-endpoint latency, upstream status codes and transferred bytes"""
 
-@mcp.tool(tags=["workspace", "databricks_workspace", "repos"])
-def get_repo_permission_levels(repo_id: str,) -> str:
-    """Get repository permission levels"""
-    url = f"/api/2.0/permissions/repos/{repo_id}/permissionLevels"
-    response = requests.get(databricks_host + url, headers=headers)
-    return response.text
+    def __init__(self):
+        self.tool_latency: defaultdict[str, Histogram] = defaultdict(Histogram)
+        self.tool_errors: defaultdict[str, int] = defaultdict(int)
+        self.endpoint_latency: defaultdict[tuple[str, str], Histogram] = defaultdict(Histogram)
+        self.statuses: defaultdict[tuple[str, str, int], int] = defaultdict(int)
+        self.retries: defaultdict[tuple[str, str], int] = defaultdict(int)
+        self.request_bytes: defaultdict[tuple[str, str], int] = defaultdict(int)
+        self.response_bytes: defaultdict[tuple[str, str], int] = defaultdict(int)
 
-@mcp.tool(tags=["workspace", "databricks_workspace", "repos"])
-def get_repos() -> str:
-    """Get all repositories"""
-    url = "/api/2.0/repos"
-    response = requests.get(databricks_host + url, headers=headers)
-    return response.text
+metrics = Metrics()
 
-class SparseCheckoutEntry(BaseModel):
-    patterns: List[str]
+@lru_cache(maxsize=4096)
+def endpoint_template(url: str) -> str:
+    """Replace object ids in an API path so that requests group by endpoint, e.g. /api/2.0/repos/{id}"""
+    return "/".join(
+        "{id}" if index > 2 and re.fullmatch(r"\d+|[0-9A-Fa-f-]{12,}", part) else part
+        for index, part in enumerate(url.split("/"))
+    )
+
+class TokenBucket:
+    """Allow `rate` requests per second on average with bursts of up to `burst` requests"""
+
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        self.lock = asyncio.Lock()
+        self.waits = 0
+
+    async def acquire(self) -> None:
+        if self.rate <= 0:
+            return
+        async with self.lock:
+            while True:
+                now = time.monotonic()
+                if now < self.paused_until:
+                    delay = self.paused_until - now
+                else:
+                    self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+                    self.updated = now
+                    if self.tokens >= 1:
+                        self.tokens -= 1
+                        return
+                    delay = (1 - self.tokens) / self.rate
+                self.waits += 1
+                await asyncio.sleep(delay)
+
+    def pause(self, seconds: float) -> None:
+        """Hold every request of this family for `seconds`, e.g. after a 429"""
+        self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+
+    def stats(self) -> dict:
+        return {"rate": self.rate, "burst": self.burst, "waits": self.waits}
 
-@mcp.tool(tags=["workspace", "databricks_workspace", "repos"])
-def create_repo(
+rate_limits = {
+    "secrets": 20,
+    "workspace": 30,
+    "permissions": 30,
+    "policies": 20,
+    "repos": 20,
+    "git-credentials": 10,
+    "default": 30,
+}
+# e.g. DATABRICKS_RATE_LIMITS="secrets=10,workspace=50"; a rate of 0 disables limiting for that family
+for override in filter(None, os.environ.get("DATABRICKS_RATE_LIMITS", "").split(",")):
+    family, _, rate = override.partition("=")
+    rate_limits[family.strip()] = float(rate)
+
+class Workspace:
+    """A Databricks workspace with its own connection pool and rate limiters"""
+
+    def __init__(self, name: str, host: str, token: str):
+        self.name = name
+        self.host = host
+        self.client = httpx.AsyncClient(
+            base_url=host,
+            headers={"Authorization": f"Bearer {token}"},
+            http2=http2,
+            limits=httpx.Limits(
+                max_connections=pool_size,
+                max_keepalive_connections=pool_size,
+                keepalive_expiry=keepalive_expiry,
+            ),
+            timeout=httpx.Timeout(read_timeout, connect=connect_timeout),
+        )
+        self.rate_limiters = {family: TokenBucket(rate, max(rate, 1)) for family, rate in rate_limits.items()}
+
+workspaces = {"default": Workspace("default", databricks_host, databricks_token)}
+# e.g. DATABRICKS_WORKSPACES="prod=https://adb-1.azuredatabricks.net,dev=https://adb-2.azuredatabricks.net"
+# with their tokens in DATABRICKS_TOKEN_PROD and DATABRICKS_TOKEN_DEV
+for entry in filter(None, os.environ.get("DATABRICKS_WORKSPACES", "").split(",")):
+    name, _, host = entry.partition("=")
+    name = name.strip()
+    token_variable = "DATABRICKS_TOKEN_" + re.sub(r"\W", "_", name).upper()
+    if token_variable not in os.environ:
+        raise RuntimeError(f"Workspace {name!r} in DATABRICKS_WORKSPACES has no token, set {token_variable}")
+    workspaces[name] = Workspace(name, host.strip(), os.environ[token_variable])
+
+# The workspace requests are sent to, fan_out switches it in the task of each workspace
+current_workspace: ContextVar[Workspace] = ContextVar("current_workspace", default=workspaces["default"])
+
+def endpoint_family(url: str) -> str:
+    """Map an API path such as /api/2.0/secrets/list to its rate limit family"""
+    parts = url.split("/")
+    family = parts[3] if len(parts) > 3 else ""
+    return family if family in rate_limits else "default"
+
+idempotent_methods = {"GET", "HEAD", "OPTIONS", "PUT", "DELETE"}
+retry_statuses = {429, 500, 502, 503, 504}
+
+def retry_after_seconds(response: httpx.Response) -> float | None:
+    value = response.headers.get("Retry-After")
+    if value is None:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        try:
+            return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+        except (TypeError, ValueError):
+            return None
+
+def backoff(attempt: int) -> float:
+    """Exponential backoff with full jitter"""
+    return random.uniform(0, min(retry_max_backoff, retry_backoff * 2 ** attempt))
+
+async def dispatch(method: str, url: str, stream: bool = False, **kwargs: Any) -> httpx.Response:
+    """Send a request once the endpoint family's rate limiter allows it
+
+    429 responses hold the whole family for their Retry-After, at most retry_max_backoff.
+    Idempotent requests that are throttled, fail with a 5xx or lose their connection are
+    retried with jittered exponential backoff, honouring Retry-After. A Retry-After longer
+    than retry_max_backoff is returned to the caller instead of being waited out.
+    """
+    workspace = current_workspace.get()
+    limiter = workspace.rate_limiters[endpoint_family(url)]
+    retryable = method in idempotent_methods
+    endpoint = (method, endpoint_template(url))
+    attempt = 0
+    while True:
+        await limiter.acquire()
+        request = workspace.client.build_request(method, url, extensions={"trace": trace}, **kwargs)
+        metrics.request_bytes[endpoint] += int(request.headers.get("Content-Length", 0))
+        start = time.perf_counter()
+        try:
+            response = await workspace.client.send(request, stream=stream)
+        except httpx.TransportError:
+            metrics.statuses[(*endpoint, 0)] += 1
+            if not retryable or attempt >= max_retries:
+                raise
+            delay = backoff(attempt)
+        else:
+            metrics.endpoint_latency[endpoint].observe(time.perf_counter() - start)
+            metrics.statuses[(*endpoint, response.status_code)] += 1
+            if not stream:
+                metrics.response_bytes[endpoint] += len(response.content)
+            if response.status_code not in retry_statuses:
+                return response
+            retry_after = retry_after_seconds(response)
+            if response.status_code == 429:
+                limiter.pause(min(retry_after, retry_max_backoff) if retry_after is not None else backoff(attempt))
+            if not retryable or attempt >= max_retries or (retry_after is not None and retry_after > retry_max_backoff):
+                return response
+            await response.aclose()
+            delay = retry_after if retry_after is not None else backoff(attempt)
+        attempt += 1
+        pool_stats["retries"] += 1
+        metrics.retries[endpoint] += 1
+        await asyncio.sleep(delay)
+
+async def send(
+    method: str,
     url: str,
-    provider: Literal["gitHub", "bitbucketCloud", "gitLab", "azureDevOpsServices", "gitHubEnterprise", "bitbucketServer", "gitLabEnterpriseEdition", "awsCodeCommit"],
-    path: Annotated[Optional[str] | None, "Optional. Desired path for the repo in the workspace"] = None,
-    sparse_checkout: Annotated[Optional[SparseCheckoutEntry] | None, "Optional. Whether to enable sparse checkout for the repo"] = None,
-) -> str:
-    """Create a new repository"""
-    url = "/api/2.0/repos"
-    data = {
-        "url": url,
-        "provider": provider,
-        "path": path,
-        "sparse_checkout": sparse_checkout,
-    }
-    response = requests.post(databricks_host + url, headers=headers, json=data)
-    return response.text
+    params: dict | None = None,
+    json: Any = None,
+    data: dict | None = None,
+    files: dict | None = None,
+    ) -> httpx.Response:
+    """Send a request to the Databricks REST API through the shared connection pool"""
+    with track_request():
+        return await dispatch(method, url, params=params, json=json, data=data, files=files)
 
-@mcp.tool(tags=["workspace", "databricks_workspace", "repos"])
-def get_repo(repo_id: str) -> str:
-    """Get a repository"""
-    url = f"/api/2.0/repos/{repo_id}"
-    response = requests.get(databricks_host + url, headers=headers)
-    return response.text
+@asynccontextmanager
+async def stream(
+    method: str,
+    url: str,
+    params: dict | None = None,
+    ) -> AsyncIterator[httpx.Response]:
+    """Open a streamed response from the Databricks REST API without reading its body"""
+    if params is not None:
+        params = {key: value for key, value in params.items() if value is not None}
+    with track_request():
+        response = await dispatch(method, url, stream=True, params=params)
+        try:
+            yield response
+        finally:
+            await response.aclose()
+            metrics.response_bytes[(method, endpoint_template(url))] += response.num_bytes_downloaded
 
-@mcp.tool(tags=["workspace", "databricks_workspace", "repos"])
-def update_repo(
-    repo_id: str,
-    branch: Annotated[Optional[str] | None, "Optional. Desired branch for the repo"] = None,
-    sparse_checkout: Annotated[Optional[SparseCheckoutEntry] | None, "Optional. Whether to enable sparse checkout for the repo"] = None,
-    tag: Annotated[Optional[str] | None, "Optional. Desired tag for the repo"] = None,
-) -> str:
-    """Update a repository"""
-    url = f"/api/2.0/repos/{repo_id}"
-    data = {
-        "url": url,
-        "branch": branch,
-        "sparse_checkout": sparse_checkout,
-        "tag": tag,
-    }
-    response = requests.patch(databricks_host + url, headers=headers, json=data)
-    return response.text
+inflight: dict[tuple, asyncio.Task] = {}
 
-@mcp.tool(tags=["workspace", "databricks_workspace", "repos"])
-def delete_repo(repo_id: int) -> str:
-    """Delete a repository"""
-    url = f"/api/2.0/repos/{repo_id}"
-    response = requests.delete(databricks_host + url, headers=headers)
-    return response.text
+async def send_coalesced(
+    method: str,
+    url: str,
+    params: dict | None = None,
+    json: Any = None,
+    ) -> httpx.Response:
+    """Share one in-flight request between concurrent identical calls"""
+    key = (current_workspace.get().name, method, url, tuple(sorted((params or {}).items())), dumps(json))
+    task = inflight.get(key)
+    if task is None:
+        task = asyncio.ensure_future(send(method, url, params=params, json=json))
+        inflight[key] = task
 
-@mcp.tool(tags=["workspace", "databricks_workspace", "secret"])
-def delete_acl(principal: str, scope: str) -> str:
-    """Delete the access control list (ACL) for a principal on a secret scope."""
-    url = "/api/2.0/secrets/acls/delete"
-    data = {
-        "principal": principal,
-        "scope": scope
-    }
-    response = requests.post(databricks_host + url, headers=headers, json=data)
-    return response.text
+        def done(task: asyncio.Task) -> None:
+            inflight.pop(key, None)
+            # Mark the exception as retrieved even when every caller was cancelled
+            if not task.cancelled():
+                task.exception()
 
-@mcp.tool(tags=["workspace", "databricks_workspace", "secret"])
-def get_acl(principal: str, scope: str) -> str:
-    """Get the access control list (ACL) for a principal on a secret scope."""
-    url = "/api/2.0/secrets/acls/get"
-    data = {
-        "principal": principal,
-        "scope": scope
-    }
-    response = requests.get(databricks_host + url, headers=headers, json=data)
-    return response.text
+        task.add_done_callback(done)
+    else:
+        pool_stats["coalesced"] += 1
+    # A cancelled caller must not cancel the request the other callers are waiting on
+    return await asyncio.shield(task)
 
-@mcp.tool(tags=["workspace", "databricks_workspace", "secret"])
-def list_acls(scope: str) -> str:
-    """List the access control lists (ACLs) for a secret scope."""
-    url = "/api/2.0/secrets/acls/list"
-    data = {
-        "scope": scope
-    }
-    response = requests.get(databricks_host + url, headers=headers, json=data)
-    return response.text
+class ResponseCache:
+    """Bounded LRU cache of successful GET responses with a TTL per endpoint family"""
 
-@mcp.tool(tags=["workspace", "databricks_workspace", "secret"])
-def create_update_acl(
-    principal: str,
-    scope: str,
-    permission: Literal["READ", "WRITE", "MANAGE"]
+    def __init__(self, maxsize: int, ttls: dict[str, float]):
+        self.maxsize = maxsize
+        self.ttls = ttls
+        self.entries: OrderedDict[tuple, tuple[float, httpx.Response]] = OrderedDict()
+        self.generations: dict[str, int] = {}
+        self.counters = {family: {"hits": 0, "misses": 0} for family in ttls}
+        self.evictions = 0
+
+    def get(self, family: str, key: tuple) -> httpx.Response | None:
+        entry = self.entries.get(key)
+        if entry is not None and entry[0] < time.monotonic():
+            del self.entries[key]
+            entry = None
+        if entry is None:
+            self.counters[family]["misses"] += 1
+            return None
+        self.entries.move_to_end(key)
+        self.counters[family]["hits"] += 1
+        return entry[1]
+
+    def set(self, family: str, key: tuple, response: httpx.Response, generation: int) -> None:
+        # Skip responses that were in flight while the family was invalidated
+        ttl = self.ttls.get(family, 0)
+        if ttl <= 0 or self.generations.get(family, 0) != generation:
+            return
+        self.entries[key] = (time.monotonic() + ttl, response)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+
+    def generation(self, family: str) -> int:
+        return self.generations.get(family, 0)
+
+    def invalidate(self, *families: str) -> None:
+        for family in families:
+            self.generations[family] = self.generations.get(family, 0) + 1
+        for key in [key for key in self.entries if key[0] in families]:
+            del self.entries[key]
+
+    def stats(self) -> dict:
+        hits = sum(counter["hits"] for counter in self.counters.values())
+        misses = sum(counter["misses"] for counter in self.counters.values())
+        return {
+            "maxsize": self.maxsize,
+            "size": len(self.entries),
+            "hits": hits,
+            "misses": misses,
+            "evictions": self.evictions,
+            "ttls": self.ttls,
+            "families": self.counters,
+        }
+
+cache_ttls = {
+    "git_credentials": 60,
+    "repos": 60,
+    "secret_scopes": 300,
+    "secret_acls": 60,
+    "secret_keys": 60,
+    "permissions": 60,
+    "permission_levels": 3600,
+    "workspace": 30,
+    "cluster_policies": 300,
+}
+# e.g. DATABRICKS_CACHE_TTLS="repos=30,workspace=0"; a TTL of 0 disables caching for that family
+for override in filter(None, os.environ.get("DATABRICKS_CACHE_TTLS", "").split(",")):
+    family, _, ttl = override.partition("=")
+    cache_ttls[family.strip()] = float(ttl)
+
+cache = ResponseCache(int(os.environ.get("DATABRICKS_CACHE_SIZE", "512")), cache_ttls)
+
+async def request(
+    method: str,
+    url: str,
+    params: dict | None = None,
+    json: Any = None,
+    data: dict | None = None,
+    files: dict | None = None,
+    cache_family: str | None = None,
+    invalidates: List[str] | None = None,
+    ) -> httpx.Response:
+    """Send a request to the Databricks REST API
+
+    Concurrent identical GET requests share one upstream call, and their responses are
+    served from the response cache when `cache_family` is given. Mutating requests
+    drop the cached responses of the `invalidates` families. `data` and `files` send a
+    multipart form, streaming file objects instead of loading them into memory.
+    """
+    if params is not None:
+        params = {key: value for key, value in params.items() if value is not None}
+    if json is not None:
+        json = to_jsonable_python(json)
+    if data is not None:
+        data = {key: value for key, value in data.items() if value is not None}
+    if method != "GET":
+        try:
+            return await send(method, url, params=params, json=json, data=data, files=files)
+        finally:
+            if invalidates:
+                cache.invalidate(*invalidates)
+    if cache_family is None:
+        return await send_coalesced(method, url, params=params, json=json)
+    key = (cache_family, current_workspace.get().name, url, tuple(sorted((params or {}).items())), dumps(json))
+    response = cache.get(cache_family, key)
+    if response is None:
+        generation = cache.generation(cache_family)
+        response = await send_coalesced(method, url, params=params, json=json)
+        if response.is_success:
+            cache.set(cache_family, key, response, generation)
+    return response
+
+def dumps(value: Any) -> str:
+    """Serialise a JSON value compactly and deterministically"""
+    return json.dumps(value, sort_keys=True, separators=(",", ":"))
+
+def encode_cursor(page_token: str | None, offset: int) -> str:
+    """Encode a position inside a paginated listing as an opaque cursor"""
+    return base64.urlsafe_b64encode(dumps([page_token, offset]).encode()).decode()
+
+def decode_cursor(cursor: str) -> tuple[str | None, int]:
+    try:
+        page_token, offset = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except (ValueError, TypeError):
+        raise ValueError(f"Invalid cursor {cursor!r}, pass the next_cursor of a previous call") from None
+    if not (page_token is None or isinstance(page_token, str)) or not isinstance(offset, int) or isinstance(offset, bool) or offset < 0:
+        raise ValueError(f"Invalid cursor {cursor!r}, pass the next_cursor of a previous call")
+    return page_token, offset
+
+async def paginate(
+    url: str,
+    params: dict,
+    cache_family: str | None = None,
+    ) -> AsyncIterator[tuple[str | None, httpx.Response]]:
+    """Yield (page_token, response) for each page of a list endpoint
+
+    The next page is requested as soon as the current one arrives, so it is in
+    flight while the caller processes the current page.
+    """
+    page_token = params.get("next_page_token")
+    page = asyncio.ensure_future(request("GET", url, params=params, cache_family=cache_family))
+    try:
+        while page is not None:
+            response = await page
+            page = None
+            next_page_token = response.json().get("next_page_token") if response.is_success else None
+            if next_page_token:
+                page = asyncio.ensure_future(request(
+                    "GET", url, params={**params, "next_page_token": next_page_token}, cache_family=cache_family,
+                ))
+            yield page_token, response
+            page_token = next_page_token
+    finally:
+        if page is not None:
+            page.cancel()
+
+async def list_pages(
+    url: str,
+    items_key: str,
+    params: dict | None = None,
+    limit: int | None = None,
+    cursor: str | None = None,
+    cache_family: str | None = None,
+    ) -> dict | httpx.Response:
+    """Collect up to `limit` items of a paginated list endpoint starting at `cursor`
+
+    Returns the items and a `next_cursor` when more remain, or the failing response.
+    """
+    if limit is not None and limit < 0:
+        raise ValueError(f"limit must be 0 or more, got {limit}")
+    page_token, offset = decode_cursor(cursor) if cursor else (None, 0)
+    items = []
+    next_cursor = None
+    async with aclosing(paginate(url, {**(params or {}), "next_page_token": page_token}, cache_family)) as pages:
+        async for page_token, response in pages:
+            if not response.is_success:
+                return response
+            page = response.json()
+            page_items = page.get(items_key, [])
+            remaining = None if limit is None else limit - len(items)
+            if remaining is not None and len(page_items) - offset > remaining:
+                items.extend(page_items[offset:offset + remaining])
+                next_cursor = encode_cursor(page_token, offset + remaining)
+                break
+            items.extend(page_items[offset:])
+            offset = 0
+            if remaining is not None and len(items) == limit and page.get("next_page_token"):
+                next_cursor = encode_cursor(page["next_page_token"], 0)
+                break
+    result = {items_key: items}
+    if next_cursor:
+        result["next_cursor"] = next_cursor
+    return result
+
+def pick(item: dict, fields: List[str]) -> dict:
+    """Keep only `fields` of an item, where a dotted field such as spark_conf.x selects inside nested objects"""
+    picked = {}
+    for field in fields:
+        value = item
+        keys = field.split(".")
+        for key in keys:
+            if not isinstance(value, dict) or key not in value:
+                break
+            value = value[key]
+        else:
+            target = picked
+            for key in keys[:-1]:
+                target = target.setdefault(key, {})
+            target[keys[-1]] = value
+    return picked
+
+def project(
+    document: dict,
+    items_key: str,
+    fields: List[str] | None = None,
+    limit: int | None = None,
+    compact: bool = True,
     ) -> str:
-    """Create or update the access control list (ACL) for a principal on a secret scope."""
-    url = "/api/2.0/secrets/acls/set"
-    data = {
-        "principal": principal,
-        "scope": scope,
-        "permission": permission,
-    }
-    response = requests.post(databricks_host + url, headers=headers, json=data)
-    return response.text
+    """Serialise a list response keeping at most `limit` items and only their `fields`"""
+    if limit is not None and limit < 0:
+        raise ValueError(f"limit must be 0 or more, got {limit}")
+    items = document.get(items_key, [])
+    if limit is not None and len(items) > limit:
+        document = {**document, "truncated": True}
+        items = items[:limit]
+    if fields:
+        items = [pick(item, fields) for item in items]
+    document = {**document, items_key: items}
+    return json.dumps(document, separators=(",", ":")) if compact else json.dumps(document)
+
+class StaticBearerToken(TokenVerifier):
+    """Accept the HTTP clients that present DATABRICKS_MCP_TOKEN as their bearer token"""
+
+    def __init__(self, token: str):
+        super().__init__()
+        self.token = token
+
+    async def verify_token(self, token: str) -> AccessToken | None:
+        if not hmac.compare_digest(token.encode(), self.token.encode()):
+            return None
+        return AccessToken(token=token, client_id="mcp-databricks", scopes=[])
+
+mcp = FastMCP("databricks")
+
+class ToolMetrics(Middleware):
+    """Record the latency and failures of every tool call"""
+
+    async def on_call_tool(self, context: MiddlewareContext, call_next):
+        name = context.message.name
+        start = time.perf_counter()
+        try:
+            return await call_next(context)
+        except Exception:
+            metrics.tool_errors[name] += 1
+            raise
+        finally:
+            metrics.tool_latency[name].observe(time.perf_counter() - start)
+
+mcp.add_middleware(ToolMetrics())
+
+class ClientConcurrency(Middleware):
+    """Limit the number of tool calls each client session runs at once, further calls wait for a slot"""
 
-@mcp.tool(tags=["workspace", "databricks_workspace", "secret"])
-def delete_secret(scope: str, key: str) -> str:
-    """Delete a secret from a secret scope."""
-    url = "/api/2.0/secrets/delete"
-    data = {
-        "scope": scope,
-        "key": key
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.semaphores: dict[str, asyncio.Semaphore] = {}
+        self.calls: dict[str, int] = defaultdict(int)
+        self.waited = 0
+
+    async def on_call_tool(self, context: MiddlewareContext, call_next):
+        session = context.fastmcp_context.session_id if context.fastmcp_context else "default"
+        semaphore = self.semaphores.setdefault(session, asyncio.Semaphore(self.limit))
+        self.calls[session] += 1
+        try:
+            if semaphore.locked():
+                self.waited += 1
+            async with semaphore:
+                return await call_next(context)
+        finally:
+            self.calls[session] -= 1
+            if not self.calls[session]:
+                del self.calls[session], self.semaphores[session]
+
+    def stats(self) -> dict:
+        return {
+            "limit": self.limit,
+            "sessions": len(self.calls),
+            "calls": sum(self.calls.values()),
+            "waited": self.waited,
+        }
+
+client_limiter = ClientConcurrency(client_concurrency)
+mcp.add_middleware(client_limiter)
+
+@mcp.resource("databricks://metrics", mime_type="application/json")
+def get_metrics() -> dict:
+    """Latency summaries per tool and per upstream endpoint, status codes, bytes, retries and cache hits"""
+    return {
+        "tools": {
+            name: {**histogram.summary(), "errors": metrics.tool_errors[name]}
+            for name, histogram in sorted(metrics.tool_latency.items())
+        },
+        "endpoints": {
+            f"{method} {endpoint}": {
+                **histogram.summary(),
+                "statuses": {status: count for (m, e, status), count in metrics.statuses.items() if (m, e) == (method, endpoint)},
+                "retries": metrics.retries[(method, endpoint)],
+                "request_bytes": metrics.request_bytes[(method, endpoint)],
+                "response_bytes": metrics.response_bytes[(method, endpoint)],
+            }
+            for (method, endpoint), histogram in sorted(metrics.endpoint_latency.items())
+        },
+        "cache": {family: counter for family, counter in cache.counters.items()},
     }
-    response = requests.post(databricks_host + url, headers=headers, json=data)
-    return response.text
 
-@mcp.tool(tags=["workspace", "databricks_workspace", "secret"])
-def get_secret(scope: str, key: str) -> str:
-    """Get a secret from a secret scope."""
-    url = "/api/2.0/secrets/get"
-    data = {
-        "scope": scope,
-        "key": key
+def prometheus_histogram(name: str, labels: str, histogram: Histogram) -> List[str]:
+    lines = []
+    cumulative = 0
+    for bound, count in zip([*Histogram.buckets, "+Inf"], histogram.counts):
+        cumulative += count
+        lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {cumulative}')
+    lines.append(f"{name}_sum{{{labels}}} {histogram.sum}")
+    lines.append(f"{name}_count{{{labels}}} {histogram.count}")
+    return lines
+
+def prometheus_metrics() -> str:
+    """Render the metrics in the Prometheus text exposition format"""
+    lines = [
+        "# TYPE databricks_mcp_tool_duration_seconds histogram",
+        *(line for name, histogram in sorted(metrics.tool_latency.items())
+          for line in prometheus_histogram("databricks_mcp_tool_duration_seconds", f'tool="{name}"', histogram)),
+        "# TYPE databricks_mcp_tool_errors_total counter",
+        *(f'databricks_mcp_tool_errors_total{{tool="{name}"}} {count}' for name, count in sorted(metrics.tool_errors.items())),
+        "# TYPE databricks_mcp_upstream_duration_seconds histogram",
+        *(line for (method, endpoint), histogram in sorted(metrics.endpoint_latency.items())
+          for line in prometheus_histogram("databricks_mcp_upstream_duration_seconds", f'method="{method}",endpoint="{endpoint}"', histogram)),
+        "# TYPE databricks_mcp_upstream_responses_total counter",
+        *(f'databricks_mcp_upstream_responses_total{{method="{method}",endpoint="{endpoint}",status="{status}"}} {count}'
+          for (method, endpoint, status), count in sorted(metrics.statuses.items())),
+        "# TYPE databricks_mcp_upstream_retries_total counter",
+        *(f'databricks_mcp_upstream_retries_total{{method="{method}",endpoint="{endpoint}"}} {count}'
+          for (method, endpoint), count in sorted(metrics.retries.items())),
+        "# TYPE databricks_mcp_upstream_request_bytes_total counter",
+        *(f'databricks_mcp_upstream_request_bytes_total{{method="{method}",endpoint="{endpoint}"}} {count}'
+          for (method, endpoint), count in sorted(metrics.request_bytes.items())),
+        "# TYPE databricks_mcp_upstream_response_bytes_total counter",
+        *(f'databricks_mcp_upstream_response_bytes_total{{method="{method}",endpoint="{endpoint}"}} {count}'
+          for (method, endpoint), count in sorted(metrics.response_bytes.items())),
+        "# TYPE databricks_mcp_cache_hits_total counter",
+        *(f'databricks_mcp_cache_hits_total{{family="{family}"}} {counter["hits"]}' for family, counter in cache.counters.items()),
+        "# TYPE databricks_mcp_cache_misses_total counter",
+        *(f'databricks_mcp_cache_misses_total{{family="{family}"}} {counter["misses"]}' for family, counter in cache.counters.items()),
+    ]
+    return "\n".join(lines) + "\n"
+
+@mcp.resource("databricks://metrics/prometheus", mime_type="text/plain")
+def get_prometheus_metrics() -> str:
+    """Metrics in the Prometheus text exposition format"""
+    return prometheus_metrics()
+
+def authorized(request: Request) -> bool:
+    """Whether an HTTP request presents DATABRICKS_MCP_TOKEN, custom routes are not covered by the MCP auth provider"""
+    if not server_token:
+        return True
+    scheme, _, token = request.headers.get("Authorization", "").partition(" ")
+    return scheme.lower() == "bearer" and hmac.compare_digest(token.encode(), server_token.encode())
+
+@mcp.custom_route("/metrics", methods=["GET"])
+async def metrics_endpoint(request: Request) -> PlainTextResponse:
+    """Prometheus scrape endpoint, served when the server runs over HTTP"""
+    if not authorized(request):
+        return PlainTextResponse("Unauthorized", status_code=401, headers={"WWW-Authenticate": "Bearer"})
+    return PlainTextResponse(prometheus_metrics(), media_type="text/plain; version=0.0.4")
+
+@mcp.resource("databricks://stats/pool", mime_type="application/json")
+def get_pool_stats() -> dict:
+    """Connection pool configuration and usage counters"""
+    return {
+        "pool_size": pool_size,
+        "keepalive_expiry": keepalive_expiry,
+        "connect_timeout": connect_timeout,
+        "read_timeout": read_timeout,
+        "http2": http2,
+        **pool_stats,
+        "connections_reused": pool_stats["requests"] - pool_stats["connections_opened"],
     }
-    response = requests.get(databricks_host + url, headers=headers, json=data)
-    return response.text
 
-@mcp.tool(tags=["workspace", "databricks_workspace", "secret"])
-def list_secrets(scope: str) -> str:
-    """List secrets in a secret scope."""
-    url = "/api/2.0/secrets/list"
-    data = {
-        "scope": scope
+@mcp.resource("databricks://stats/rate_limits", mime_type="application/json")
+def get_rate_limit_stats() -> dict:
+    """Rate limit per workspace and endpoint family and how often requests had to wait for it"""
+    return {
+        name: {family: limiter.stats() for family, limiter in workspace.rate_limiters.items()}
+        for name, workspace in workspaces.items()
     }
-    response = requests.get(databricks_host + url, headers=headers, json=data)
-    return response.text
 
-@mcp.tool(tags=["workspace", "databricks_workspace", "secret"])
-def create_secret(
-    scope: str,
-    key: str,
-    string_value: Annotated[Optional[str] | None, "Optional. The string value of the secret. Either string_value or bytes_value must be provided."] = None,
-    bytes_value: Annotated[Optional[bytes] | None, "Optional. The byte value of the secret. Either string_value or bytes_value must be provided."] = None,
-    ) -> str:
-    """Create a secret in a secret scope."""
-    url = "/api/2.0/secrets/put"
-    data = {
-        "scope": scope,
-        "key": key,
-        "string_value": string_value,
-        "bytes_value": bytes_value,
+@mcp.resource("databricks://workspaces", mime_type="application/json")
+def get_workspaces() -> dict:
+    """Configured workspaces with their host and rate limiter counters"""
+    return {
+        name: {
+            "host": workspace.host,
+            "rate_limits": {family: limiter.stats() for family, limiter in workspace.rate_limiters.items()},
+        }
+        for name, workspace in workspaces.items()
     }
-    response = requests.post(databricks_host + url, headers=headers, json=data)
-    return response.text
 
-@mcp.tool(tags=["workspace", "databricks_workspace", "secret"])
-def create_scope(
-    scope: str,
-    initial_manage_principal: Annotated[Optional[str] | None, "Optional. The principal (user or group) that is granted the MANAGE permission on the created secret scope. If not specified, the caller is granted the MANAGE permission."] = None,
+@mcp.resource("databricks://stats/clients", mime_type="application/json")
+def get_client_stats() -> dict:
+    """Client sessions with tool calls in progress and how often a call waited for the per-client limit"""
+    return client_limiter.stats()
+
+@mcp.custom_route("/health", methods=["GET"])
+async def health_endpoint(request: Request) -> PlainTextResponse:
+    """Liveness endpoint, served when the server runs over HTTP"""
+    return PlainTextResponse("ok")
+
+@mcp.resource("databricks://stats/cache", mime_type="application/json")
+def get_cache_stats() -> dict:
+    """Response cache size, TTLs and hit/miss counters"""
+    return cache.stats()
+
+def tool_enabled(tags: List[str]) -> bool:
+    """Whether tools with these tags are enabled, all tools are when DATABRICKS_TOOL_TAGS is not set"""
+    return not tool_tags or not tool_tags.isdisjoint(tags)
+
+def tool(tags: List[str]) -> Callable[[Callable], Callable]:
+    """Register a tool like mcp.tool, unless none of its tags are enabled"""
+    def register(fn: Callable) -> Callable:
+        if tool_enabled(tags):
+            mcp.tool(fn, tags=set(tags))
+        return fn
+    return register
+
+class Endpoint(BaseModel):
+    """A REST endpoint exposed as a tool.
+
+    The fields of `params` are the path parameters named in `path` and the query parameters,
+    the fields of `body` are sent as the JSON body. Both become the parameters of the tool.
+    """
+    name: str
+    description: str
+    tags: List[str]
+    method: Literal["GET", "POST", "PUT", "PATCH", "DELETE"]
+    path: str
+    params: Optional[type[BaseModel]] = None
+    body: Optional[type[BaseModel]] = None
+    cache_family: Optional[str] = None
+    invalidates: Optional[List[str]] = None
+
+def endpoint_tool(endpoint: Endpoint) -> Callable[..., Awaitable[str]]:
+    """Build the tool function of an endpoint"""
+    path_keys = [key for _, key, _, _ in string.Formatter().parse(endpoint.path) if key]
+    parameters = []
+    for model in (endpoint.params, endpoint.body):
+        if model is None:
+            continue
+        hints = get_type_hints(model, include_extras=True)
+        for name, field in model.model_fields.items():
+            default = inspect.Parameter.empty if field.is_required() else field.default
+            parameters.append(inspect.Parameter(name, inspect.Parameter.KEYWORD_ONLY, annotation=hints[name], default=default))
+
+    async def call_endpoint(**arguments) -> str:
+        params = endpoint.params.model_validate(arguments).model_dump() if endpoint.params else {}
+        url = endpoint.path.format(**{key: params.pop(key) for key in path_keys})
+        data = endpoint.body.model_validate(arguments).model_dump() if endpoint.body else None
+        response = await request(
+            endpoint.method, url, params=params or None, json=data,
+            cache_family=endpoint.cache_family, invalidates=endpoint.invalidates,
+        )
+        return response.text
+
+    call_endpoint.__name__ = endpoint.name
+    call_endpoint.__doc__ = endpoint.description
+    call_endpoint.__signature__ = inspect.Signature(parameters, return_annotation=str)
+    call_endpoint.__annotations__ = {parameter.name: parameter.annotation for parameter in parameters} | {"return": str}
+    return call_endpoint
+
+git_providers = Literal["gitHub", "bitbucketCloud", "gitLab", "azureDevOpsServices", "gitHubEnterprise", "bitbucketServer", "gitLabEnterpriseEdition", "awsCodeCommit"]
+
+class GitCredentialId(BaseModel):
+    credential_id: int
+
+class GitCredential(BaseModel):
+    git_provider: git_providers
+    git_email: Annotated[str | None, "Optional. The authenticating email associated with your Git provider user account. Used for authentication with the remote repository and also sets the author & committer identity for commits. Required for most Git providers except AWS CodeCommit"] = None
+    git_username: Annotated[str | None, "Optional. The Git username associated with the credential. Required for AWS CodeCommit"] = None
+    is_default_for_provider: Annotated[bool | None, "Optional"] = None
+    name: Annotated[str | None, "Optional"] = None
+    personal_access_token: Annotated[str | None, "Optional"] = None
+
+class AccessControlEntry(BaseModel):
+    group_name: Optional[str] = None
+    permission_level: Optional[Literal["CAN_MANAGE", "CAN_EDIT", "CAN_RUN", "CAN_READ", "CAN_USE"]] = None
+    service_principal_name: Optional[str] = None
+    user_name: Optional[str] = None
+
+class AccessControlList(BaseModel):
+    access_control_list: Annotated[Optional[List[AccessControlEntry]] | None, "Optional. List of access control entries"] = None
+
+class RepoId(BaseModel):
+    repo_id: str
+
+class SparseCheckoutEntry(BaseModel):
+    patterns: List[str]
+
+class NewRepo(BaseModel):
+    url: str
+    provider: git_providers
+    path: Annotated[Optional[str] | None, "Optional. Desired path for the repo in the workspace"] = None
+    sparse_checkout: Annotated[Optional[SparseCheckoutEntry] | None, "Optional. Whether to enable sparse checkout for the repo"] = None
+
+class RepoUpdate(BaseModel):
+    branch: Annotated[Optional[str] | None, "Optional. Desired branch for the repo"] = None
+    sparse_checkout: Annotated[Optional[SparseCheckoutEntry] | None, "Optional. Whether to enable sparse checkout for the repo"] = None
+    tag: Annotated[Optional[str] | None, "Optional. Desired tag for the repo"] = None
+
+class SecretScope(BaseModel):
+    scope: str
+
+class NewSecretScope(BaseModel):
+    scope: str
+    initial_manage_principal: Annotated[Optional[str] | None, "Optional. The principal (user or group) that is granted the MANAGE permission on the created secret scope. If not specified, the caller is granted the MANAGE permission."] = None
     scope_backend_type: Annotated[Optional[Literal["DATABRICKS", "AZURE_KEYVAULT"]] | None, "Optional. If not specified, will default to DATABRICKS."] = None
-    ) -> str:
-    """Create a secret scope."""
-    url = "/api/2.0/secrets/scopes/create"
-    data = {
-        "scope": scope,
-        "initial_manage_principal": initial_manage_principal,
-        "scope_backend_type": scope_backend_type,
-    }
-    response = requests.post(databricks_host + url, headers=headers, json=data)
-    return response.text
 
-@mcp.tool(tags=["workspace", "databricks_workspace", "secret"])
-def delete_scope(scope: str) -> str:
-    """Delete a secret scope."""
-    url = "/api/2.0/secrets/scopes/delete"
-    data = {
-        "scope": scope
-    }
-    response = requests.post(databricks_host + url, headers=headers, json=data)
-    return response.text
+class SecretScopePrincipal(BaseModel):
+    principal: str
+    scope: str
 
-@mcp.tool(tags=["workspace", "databricks_workspace", "secret"])
-def list_scopes() -> str:
-    """List secret scopes."""
-    url = "/api/2.0/secrets/scopes/list"
-    response = requests.get(databricks_host + url, headers=headers)
-    return response.text
+class SecretScopeAcl(BaseModel):
+    principal: str
+    scope: str
+    permission: Literal["READ", "WRITE", "MANAGE"]
 
-@mcp.tool(tags=["workspace", "databricks_workspace", "workspace"])
-def get_workspace_object_permission(
-    workspace_object_type: str,
-    workspace_object_id: str,
-    ) -> str:
-    """Get workspace object permissions"""
-    url = f"/api/2.0/permissions/{workspace_object_type}/{workspace_object_id}"
-    response = requests.get(databricks_host + url, headers=headers)
-    return response.text
+class SecretKey(BaseModel):
+    scope: str
+    key: str
 
-@mcp.tool(tags=["workspace", "databricks_workspace", "workspace"])
-def set_workspace_object_permission(
-    workspace_object_type: str,
-    workspace_object_id: str,
+class SecretValue(BaseModel):
+    scope: str
+    key: str
+    string_value: Annotated[Optional[str] | None, "Optional. The string value of the secret. Either string_value or bytes_value must be provided."] = None
+    bytes_value: Annotated[Optional[bytes] | None, "Optional. The byte value of the secret. Either string_value or bytes_value must be provided."] = None
+
+class WorkspaceObjectId(BaseModel):
+    workspace_object_type: str
+    workspace_object_id: str
+
+class WorkspacePath(BaseModel):
+    path: str
+
+class WorkspaceDelete(BaseModel):
+    path: str
+    recursive: bool | None = False
+
+class ClusterPolicyId(BaseModel):
+    cluster_policy_id: str
+
+class PolicyId(BaseModel):
+    policy_id: str
+
+class ClusterPolicy(BaseModel):
+    name: str
+    definition: Annotated[Optional[dict] | None, "Optional. Dictionary containing policy definition. Example: {'custom_tags.test_tag': {'type': 'fixed', 'value': 'test_value'}}"] = None
+    description: Annotated[Optional[str] | None, "Optional. Description of the cluster policy."] = None
+    libraries: Annotated[Optional[List[str]] | None, "Optional. List of libraries to be installed on the cluster."] = None
+    max_clusters_per_user: Annotated[Optional[int] | None, "Optional. Maximum number of clusters that a user can create with this policy."] = None
+    policy_family_definition_overrides: Annotated[Optional[dict] | None, "Optional. JSON string containing overrides for the policy family definition."] = None
+    policy_family_id: Annotated[Optional[str] | None, "Optional. ID of the policy family to which this cluster policy belongs."] = None
+
+class ClusterPolicyUpdate(BaseModel):
+    policy_id: str
+    name: Annotated[Optional[str] | None, "Optional. Name of the cluster policy."] = None
+    definition: Annotated[Optional[dict] | None, "Optional. Dictionary containing policy definition. Example: {'custom_tags.test_tag': {'type': 'fixed', 'value': 'test_value'}}"] = None
+    description: Annotated[Optional[str] | None, "Optional. Description of the cluster policy."] = None
+    libraries: Annotated[Optional[List[str]] | None, "Optional. List of libraries to be installed on the cluster."] = None
+    max_clusters_per_user: Annotated[Optional[int] | None, "Optional. Maximum number of clusters that a user can create with this policy."] = None
+    policy_family_definition_overrides: Annotated[Optional[dict] | None, "Optional. JSON string containing overrides for the policy family definition."] = None
+
+git_credentials_tags = ["workspace", "databricks_workspace", "git_credentials"]
+repos_tags = ["workspace", "databricks_workspace", "repos"]
+secret_tags = ["workspace", "databricks_workspace", "secret"]
+workspace_tags = ["workspace", "databricks_workspace", "workspace"]
+cluster_policies_tags = ["workspace", "compute", "cluster_policies"]
+
+endpoints = [
+    Endpoint(name="list_git_credentials", description="List the Git credentials", tags=git_credentials_tags,
+             method="GET", path="/api/2.0/git-credentials", cache_family="git_credentials"),
+    Endpoint(name="create_git_credentials", description="Create Git credentials", tags=git_credentials_tags,
+             method="POST", path="/api/2.0/git-credentials", body=GitCredential, invalidates=["git_credentials"]),
+    Endpoint(name="get_git_credential", description="Get a Git credential", tags=git_credentials_tags,
+             method="GET", path="/api/2.0/git-credentials/{credential_id}", params=GitCredentialId, cache_family="git_credentials"),
+    Endpoint(name="update_git_credential", description="Update a Git credential", tags=git_credentials_tags,
+             method="PATCH", path="/api/2.0/git-credentials/{credential_id}", params=GitCredentialId, body=GitCredential,
+             invalidates=["git_credentials"]),
+    Endpoint(name="delete_git_credential", description="Delete a Git credential", tags=git_credentials_tags,
+             method="DELETE", path="/api/2.0/git-credentials/{credential_id}", params=GitCredentialId, invalidates=["git_credentials"]),
+
+    Endpoint(name="get_repo_permissions", description="Get repository permissions", tags=repos_tags,
+             method="GET", path="/api/2.0/permissions/repos/{repo_id}", params=RepoId, cache_family="permissions"),
+    Endpoint(name="update_repo_permissions", description="Update repository permissions", tags=repos_tags,
+             method="PATCH", path="/api/2.0/permissions/repos/{repo_id}", params=RepoId, body=AccessControlList,
+             invalidates=["permissions"]),
+    Endpoint(name="get_repo_permission_levels", description="Get repository permission levels", tags=repos_tags,
+             method="GET", path="/api/2.0/permissions/repos/{repo_id}/permissionLevels", params=RepoId, cache_family="permission_levels"),
+    Endpoint(name="create_repo", description="Create a new repository", tags=repos_tags,
+             method="POST", path="/api/2.0/repos", body=NewRepo, invalidates=["repos", "workspace"]),
+    Endpoint(name="get_repo", description="Get a repository", tags=repos_tags,
+             method="GET", path="/api/2.0/repos/{repo_id}", params=RepoId, cache_family="repos"),
+    Endpoint(name="update_repo", description="Update a repository", tags=repos_tags,
+             method="PATCH", path="/api/2.0/repos/{repo_id}", params=RepoId, body=RepoUpdate, invalidates=["repos", "workspace"]),
+    Endpoint(name="delete_repo", description="Delete a repository", tags=repos_tags,
+             method="DELETE", path="/api/2.0/repos/{repo_id}", params=RepoId, invalidates=["repos", "workspace", "permissions"]),
+
+    Endpoint(name="delete_acl", description="Delete the access control list (ACL) for a principal on a secret scope.", tags=secret_tags,
+             method="POST", path="/api/2.0/secrets/acls/delete", body=SecretScopePrincipal, invalidates=["secret_acls"]),
+    Endpoint(name="get_acl", description="Get the access control list (ACL) for a principal on a secret scope.", tags=secret_tags,
+             method="GET", path="/api/2.0/secrets/acls/get", params=SecretScopePrincipal, cache_family="secret_acls"),
+    Endpoint(name="list_acls", description="List the access control lists (ACLs) for a secret scope.", tags=secret_tags,
+             method="GET", path="/api/2.0/secrets/acls/list", params=SecretScope, cache_family="secret_acls"),
+    Endpoint(name="create_update_acl", description="Create or update the access control list (ACL) for a principal on a secret scope.", tags=secret_tags,
+             method="POST", path="/api/2.0/secrets/acls/set", body=SecretScopeAcl, invalidates=["secret_acls"]),
+    Endpoint(name="delete_secret", description="Delete a secret from a secret scope.", tags=secret_tags,
+             method="POST", path="/api/2.0/secrets/delete", body=SecretKey, invalidates=["secret_keys"]),
+    Endpoint(name="get_secret", description="Get a secret from a secret scope.", tags=secret_tags,
+             method="GET", path="/api/2.0/secrets/get", params=SecretKey),
+    Endpoint(name="list_secrets", description="List secrets in a secret scope.", tags=secret_tags,
+             method="GET", path="/api/2.0/secrets/list", params=SecretScope, cache_family="secret_keys"),
+    Endpoint(name="create_secret", description="Create a secret in a secret scope.", tags=secret_tags,
+             method="POST", path="/api/2.0/secrets/put", body=SecretValue, invalidates=["secret_keys"]),
+    Endpoint(name="create_scope", description="Create a secret scope.", tags=secret_tags,
+             method="POST", path="/api/2.0/secrets/scopes/create", body=NewSecretScope, invalidates=["secret_scopes"]),
+    Endpoint(name="delete_scope", description="Delete a secret scope.", tags=secret_tags,
+             method="POST", path="/api/2.0/secrets/scopes/delete", body=SecretScope, invalidates=["secret_scopes", "secret_acls", "secret_keys"]),
+    Endpoint(name="list_scopes", description="List secret scopes.", tags=secret_tags,
+             method="GET", path="/api/2.0/secrets/scopes/list", cache_family="secret_scopes"),
+
+    Endpoint(name="get_workspace_object_permission", description="Get workspace object permissions", tags=workspace_tags,
+             method="GET", path="/api/2.0/permissions/{workspace_object_type}/{workspace_object_id}", params=WorkspaceObjectId,
+             cache_family="permissions"),
+    Endpoint(name="update_workspace_object_permission", description="Update workspace object permissions", tags=workspace_tags,
+             method="PATCH", path="/api/2.0/permissions/{workspace_object_type}/{workspace_object_id}", params=WorkspaceObjectId,
+             body=AccessControlList, invalidates=["permissions"]),
+    Endpoint(name="get_workspace_object_permission_levels", description="Get workspace object permission levels", tags=workspace_tags,
+             method="GET", path="/api/2.0/permissions/{workspace_object_type}/{workspace_object_id}/permissionLevels",
+             params=WorkspaceObjectId, cache_family="permission_levels"),
+    Endpoint(name="delete_workspace_object", description="Delete a workspace object", tags=workspace_tags,
+             method="POST", path="/api/2.0/workspace/delete", body=WorkspaceDelete, invalidates=["workspace", "permissions"]),
+    Endpoint(name="get_object_status", description="Get the status of a workspace object", tags=workspace_tags,
+             method="GET", path="/api/2.0/workspace/get-status", params=WorkspacePath, cache_family="workspace"),
+    Endpoint(name="create_directory", description="Create a directory in the workspace", tags=workspace_tags,
+             method="POST", path="/api/2.0/workspace/mkdirs", body=WorkspacePath, invalidates=["workspace"]),
+
+    Endpoint(name="get_cluster_policy_permissions", description="Get cluster policy permissions", tags=cluster_policies_tags,
+             method="GET", path="/api/2.0/permissions/cluster-policies/{cluster_policy_id}", params=ClusterPolicyId,
+             cache_family="permissions"),
+    Endpoint(name="update_cluster_policy_permissions", description="Update cluster policy permissions", tags=cluster_policies_tags,
+             method="PATCH", path="/api/2.0/permissions/cluster-policies/{cluster_policy_id}", params=ClusterPolicyId,
+             body=AccessControlList, invalidates=["permissions"]),
+    Endpoint(name="get_cluster_policy_permission_levels", description="Get cluster policy permission levels", tags=cluster_policies_tags,
+             method="GET", path="/api/2.0/permissions/cluster-policies/{cluster_policy_id}/permissionLevels", params=ClusterPolicyId,
+             cache_family="permission_levels"),
+    Endpoint(name="create_cluster_policy", description="Create a cluster policy", tags=cluster_policies_tags,
+             method="POST", path="/api/2.0/policies/clusters/create", body=ClusterPolicy, invalidates=["cluster_policies"]),
+    Endpoint(name="delete_cluster_policy", description="Delete a cluster policy", tags=cluster_policies_tags,
+             method="POST", path="/api/2.0/policies/clusters/delete", body=PolicyId, invalidates=["cluster_policies", "permissions"]),
+    Endpoint(name="update_cluster_policy", description="Update a cluster policy", tags=cluster_policies_tags,
+             method="POST", path="/api/2.0/policies/clusters/edit", body=ClusterPolicyUpdate, invalidates=["cluster_policies"]),
+    Endpoint(name="get_cluster_policy", description="Get a cluster policy", tags=cluster_policies_tags,
+             method="GET", path="/api/2.0/policies/clusters/get", params=PolicyId, cache_family="cluster_policies"),
+]
+
+for endpoint in endpoints:
+    if tool_enabled(endpoint.tags):
+        mcp.tool(endpoint_tool(endpoint), name=endpoint.name, tags=set(endpoint.tags))
+
+@tool(tags=["workspace", "databricks_workspace", "repos"])
+async def set_repo_permissions(
+    repo_id: str,
     access_control_list: Annotated[Optional[List[AccessControlEntry]] | None, "Optional. List of access control entries"] = None,
+    reconcile: Annotated[bool, "Only write when the current permissions differ, sending the smallest change, and return a report of the changes"] = False,
     ) -> str:
-    """Set workspace object permissions"""
-    url = f"/api/2.0/permissions/{workspace_object_type}/{workspace_object_id}"
+    """Set repository permissions"""
+    if reconcile:
+        return json.dumps(await reconcile_acl("repos", repo_id, access_control_list or []))
+    url = f"/api/2.0/permissions/repos/{repo_id}"
     data = {"access_control_list": access_control_list}
-    response = requests.put(databricks_host + url, headers=headers, json=data)
+    response = await request("PUT", url, json=data, invalidates=["permissions"])
     return response.text
 
-@mcp.tool(tags=["workspace", "databricks_workspace", "workspace"])
-def update_workspace_object_permission(
+@tool(tags=["workspace", "databricks_workspace", "repos"])
+async def get_repos(
+    path_prefix: Annotated[Optional[str] | None, "Optional. Only return repos whose path starts with this prefix"] = None,
+    limit: Annotated[int, Field(ge=0, description="Maximum number of repos to return, pass the returned next_cursor to get the next ones")] = 100,
+    cursor: Annotated[Optional[str] | None, "Optional. The next_cursor returned by a previous call, to continue the listing"] = None,
+    fields: Annotated[Optional[List[str]] | None, "Optional. Only return these fields of each repo, e.g. ['id', 'path', 'branch']. Dotted names select nested fields"] = None,
+    compact: Annotated[bool, "Serialise the result without whitespace"] = True,
+) -> str:
+    """Get repositories, a page at a time"""
+    url = "/api/2.0/repos"
+    params = {"path_prefix": path_prefix}
+    result = await list_pages(url, "repos", params=params, limit=limit, cursor=cursor, cache_family="repos")
+    if isinstance(result, httpx.Response):
+        return result.text
+    return project(result, "repos", fields, compact=compact)
+
+@tool(tags=["workspace", "databricks_workspace", "secret"])
+async def get_secret_inventory(
+    concurrency: Annotated[int, Field(ge=1, description="Number of secret scopes read in parallel")] = 8,
+    ) -> str:
+    """List every secret scope with its ACLs, key count and last update in one call."""
+    response = await request("GET", "/api/2.0/secrets/scopes/list", cache_family="secret_scopes")
+    if not response.is_success:
+        return response.text
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def read_scope(scope: dict) -> tuple[dict, httpx.Response, httpx.Response]:
+        params = {"scope": scope["name"]}
+        async with semaphore:
+            acls, secrets = await asyncio.gather(
+                request("GET", "/api/2.0/secrets/acls/list", params=params, cache_family="secret_acls"),
+                request("GET", "/api/2.0/secrets/list", params=params, cache_family="secret_keys"),
+            )
+        return scope, acls, secrets
+
+    scopes = []
+    rows = []
+    errors = []
+    for scope, acls, secrets in await asyncio.gather(*(read_scope(scope) for scope in response.json().get("scopes", []))):
+        for name, listing in (("acls", acls), ("secrets", secrets)):
+            if not listing.is_success:
+                errors.append({"scope": scope["name"], "listing": name, "error": listing.text})
+        keys = secrets.json().get("secrets", []) if secrets.is_success else []
+        scopes.append({
+            "scope": scope["name"],
+            "backend_type": scope.get("backend_type"),
+            "key_count": len(keys) if secrets.is_success else None,
+            "last_updated_timestamp": max((key.get("last_updated_timestamp", 0) for key in keys), default=None),
+        })
+        for acl in acls.json().get("items", []) if acls.is_success else []:
+            rows.append([scope["name"], acl.get("principal"), acl.get("permission")])
+    return json.dumps({
+        "scopes": scopes,
+        "acls": {"columns": ["scope", "principal", "permission"], "rows": rows},
+        "errors": errors,
+    })
+
+@tool(tags=["workspace", "databricks_workspace", "workspace"])
+async def set_workspace_object_permission(
     workspace_object_type: str,
     workspace_object_id: str,
     access_control_list: Annotated[Optional[List[AccessControlEntry]] | None, "Optional. List of access control entries"] = None,
+    reconcile: Annotated[bool, "Only write when the current permissions differ, sending the smallest change, and return a report of the changes"] = False,
     ) -> str:
-    """Update workspace object permissions"""
+    """Set workspace object permissions"""
+    if reconcile:
+        return json.dumps(await reconcile_acl(workspace_object_type, workspace_object_id, access_control_list or []))
     url = f"/api/2.0/permissions/{workspace_object_type}/{workspace_object_id}"
     data = {"access_control_list": access_control_list}
-    response = requests.patch(databricks_host + url, headers=headers, json=data)
+    response = await request("PUT", url, json=data, invalidates=["permissions"])
     return response.text
 
-@mcp.tool(tags=["workspace", "databricks_workspace", "workspace"])
-def get_workspace_object_permission_levels(
-    workspace_object_type: str,
-    workspace_object_id: str,
-    ) -> str:
-    """Get workspace object permission levels"""
-    url = f"/api/2.0/permissions/{workspace_object_type}/{workspace_object_id}/permissionLevels"
-    response = requests.get(databricks_host + url, headers=headers)
-    return response.text
+def local_file(path: str) -> str:
+    """Resolve a local path given to a tool, confined to DATABRICKS_MCP_LOCAL_ROOT when it is set"""
+    if local_root is None:
+        if transport == "http":
+            raise ValueError("Local files are disabled when serving over HTTP, set DATABRICKS_MCP_LOCAL_ROOT to allow them below a directory")
+        return os.path.abspath(os.path.expanduser(path))
+    root = os.path.realpath(os.path.expanduser(local_root))
+    resolved = os.path.realpath(os.path.join(root, path))
+    if os.path.commonpath([root, resolved]) != root:
+        raise ValueError(f"{path} is outside DATABRICKS_MCP_LOCAL_ROOT {root}")
+    return resolved
 
-@mcp.tool(tags=["workspace", "databricks_workspace", "workspace"])
-def delete_workspace_object(path: str, recursive: bool | None = False) -> str:
-    """Delete a workspace object"""
-    url = "/api/2.0/workspace/delete"
-    data = {"path": path, "recursive": recursive}
-    response = requests.post(databricks_host + url, headers=headers, json=data)
-    return response.text
+async def download(url: str, params: dict, local_path: str, max_bytes: int) -> dict | httpx.Response:
+    """Stream a GET response body into `local_path` in chunks, hashing it on the way
 
-@mcp.tool(tags=["workspace", "databricks_workspace", "workspace"])
-def export_workspace_object(
+    The body is written to a temporary file that only replaces `local_path` once complete.
+    Returns the file metadata, or the failing response.
+    """
+    local_path = local_file(local_path)
+    os.makedirs(os.path.dirname(local_path), exist_ok=True)
+    partial_path = local_path + ".part"
+    digest = hashlib.sha256()
+    size = 0
+    async with stream("GET", url, params=params) as response:
+        if not response.is_success:
+            await response.aread()
+            return response
+        if int(response.headers.get("Content-Length", 0)) > max_bytes:
+            raise ValueError(f"{params.get('path', url)} is {response.headers['Content-Length']} bytes, larger than max_bytes={max_bytes}")
+        try:
+            with open(partial_path, "wb") as file:
+                async for chunk in response.aiter_bytes(1024 * 1024):
+                    size += len(chunk)
+                    if size > max_bytes:
+                        raise ValueError(f"{params.get('path', url)} is larger than max_bytes={max_bytes}")
+                    digest.update(chunk)
+                    file.write(chunk)
+        except BaseException:
+            if os.path.exists(partial_path):
+                os.remove(partial_path)
+            raise
+    os.replace(partial_path, local_path)
+    return {"local_path": local_path, "bytes": size, "sha256": digest.hexdigest()}
+
+@tool(tags=["workspace", "databricks_workspace", "workspace"])
+async def export_workspace_object(
     path: str,
     format: Literal["SOURCE", "HTML", "JUPYTER", "DBC", "R_MARKDOWN", "AUTO", "RAW"] = "SOURCE",
     direct_download: bool | None = False,
+    local_path: Annotated[Optional[str] | None, "Optional. Local file to stream the exported content into instead of returning it. Returns the file size and SHA-256 hash"] = None,
+    max_bytes: Annotated[Optional[int] | None, "Optional. Abort the export to local_path once it exceeds this many bytes"] = None,
     ) -> str:
     """Export a workspace object"""
     url = "/api/2.0/workspace/export"
+    if local_path is not None:
+        params = {"path": path, "format": format, "direct_download": True}
+        result = await download(url, params, local_path, max_bytes or export_max_bytes)
+        if isinstance(result, httpx.Response):
+            return result.text
+        return json.dumps({"path": path, **result})
     params = {"path": path, "format": format, "direct_download": direct_download}
-    response = requests.get(databricks_host + url, headers=headers, params=params)
+    response = await request("GET", url, params=params)
     return response.text
 
-@mcp.tool(tags=["workspace", "databricks_workspace", "workspace"])
-def get_object_status(path: str) -> str:
-    """Get the status of a workspace object"""
-    url = "/api/2.0/workspace/get-status"
-    params = {"path": path}
-    response = requests.get(databricks_host + url, headers=headers, params=params)
-    return response.text
+async def upload(
+    path: str,
+    local_path: str,
+    format: str,
+    language: str | None = None,
+    overwrite: bool | None = False,
+    ) -> httpx.Response:
+    """Import a local file as a workspace object, streaming it as a multipart upload without base64 encoding"""
+    url = "/api/2.0/workspace/import"
+    data = {"path": path, "format": format, "language": language, "overwrite": "true" if overwrite else "false"}
+    with open(local_file(local_path), "rb") as file:
+        files = {"content": (os.path.basename(local_path), file, "application/octet-stream")}
+        return await request("POST", url, data=data, files=files, invalidates=["workspace"])
 
-@mcp.tool(tags=["workspace", "databricks_workspace", "workspace"])
-def import_workspace_object(
+@tool(tags=["workspace", "databricks_workspace", "workspace"])
+async def import_workspace_object(
     path: str,
-    content: Annotated[Optional[str] | None, "Optional. Base64-encoded content of the object to be imported. Required if overwrite is true or if the object does not already exist at the specified path."] = None,
+    content: Annotated[Optional[str] | None, "Optional. Base64-encoded content of the object to be imported. Required if overwrite is true or if the object does not already exist at the specified path, unless local_path is given."] = None,
     format: Literal["SOURCE", "HTML", "JUPYTER", "DBC", "R_MARKDOWN", "AUTO", "RAW"] = "SOURCE",
     language: Annotated[Optional[Literal["SCALA", "PYTHON", "SQL", "R"]] | None, "Optional. This value is set only if the object type is NOTEBOOK."] = None,
     overwrite: bool | None = False,
+    local_path: Annotated[Optional[str] | None, "Optional. Local file to upload as the content instead of passing it base64-encoded in content"] = None,
     ) -> str:
     """Import a workspace object"""
+    if local_path is not None:
+        if content is not None:
+            raise ValueError("Pass either content or local_path, not both")
+        response = await upload(path, local_path, format, language, overwrite)
+        return response.text
     url = "/api/2.0/workspace/import"
     data = {"path": path, "content": content, "format": format, "language": language, "overwrite": overwrite}
-    response = requests.post(databricks_host + url, headers=headers, json=data)
+    response = await request("POST", url, json=data, invalidates=["workspace"])
     return response.text
 
-@mcp.tool(tags=["workspace", "databricks_workspace", "workspace"])
-def list_workspace_objects(path: str, notebooks_modified_after: Annotated[int | None, "Optional. UTC timestamp in milliseconds"] = None) -> str:
+@tool(tags=["workspace", "databricks_workspace", "workspace"])
+async def list_workspace_objects(
+    path: str,
+    notebooks_modified_after: Annotated[int | None, "Optional. UTC timestamp in milliseconds"] = None,
+    fields: Annotated[Optional[List[str]] | None, "Optional. Only return these fields of each object, e.g. ['path', 'object_type']. Dotted names select nested fields"] = None,
+    limit: Annotated[Optional[int] | None, Field(ge=0, description="Optional. Maximum number of objects to return")] = None,
+    compact: Annotated[bool, "Serialise the result without whitespace"] = True,
+    ) -> str:
     """List workspace objects"""
     url = "/api/2.0/workspace/list"
     params = {"path": path}
     if notebooks_modified_after:
         params["notebooks_modified_after"] = notebooks_modified_after
-    response = requests.get(databricks_host + url, headers=headers, params=params)
-    return response.text
+    response = await request("GET", url, params=params, cache_family="workspace")
+    if not response.is_success or (fields is None and limit is None and not compact):
+        return response.text
+    return project(response.json(), "objects", fields, limit, compact)
 
-@mcp.tool(tags=["workspace", "databricks_workspace", "workspace"])
-def create_directory(path: str) -> str:
-    """Create a directory in the workspace"""
-    url = "/api/2.0/workspace/mkdirs"
-    data = {"path": path}
-    response = requests.post(databricks_host + url, headers=headers, json=data)
-    return response.text
+async def walk_workspace(
+    path: str,
+    max_depth: int | None = None,
+    concurrency: int = 8,
+    notebooks_modified_after: int | None = None,
+    cache_family: str | None = "workspace",
+    pending: deque | None = None,
+    ) -> AsyncIterator[tuple[list, List[dict]]]:
+    """Yield the entry and objects of each directory under `path`, breadth-first, as soon as it is listed
 
-@mcp.tool(tags=["workspace", "compute", "cluster_policies"])
-def get_cluster_policy_permissions(
-    cluster_policy_id: str,
-    ) -> str:
-    """Get cluster policy permissions"""
-    url = f"/api/2.0/permissions/cluster-policies/{cluster_policy_id}"
-    response = requests.get(databricks_host + url, headers=headers)
-    return response.text
+    Up to `concurrency` directories and repos are listed in parallel. A directory that
+    cannot be listed yields a single `{"path": ..., "error": ...}` entry.
 
-@mcp.tool(tags=["workspace", "compute", "cluster_policies"])
-def set_cluster_policy_permissions(
-    cluster_policy_id: str,
-    access_control_list: Annotated[Optional[List[AccessControlEntry]] | None, "Optional. List of access control entries"] = None,
+    Directories still to list are kept as [path, depth, skip] entries in `pending`, which
+    can be passed in to resume an earlier walk instead of starting at `path`. Directories
+    being listed when the walk is closed are put back on it. An entry whose skip is not
+    None was already descended into, only its objects after the first `skip` are yielded.
+    """
+    url = "/api/2.0/workspace/list"
+
+    async def list_directory(directory: str) -> httpx.Response:
+        params = {"path": directory, "notebooks_modified_after": notebooks_modified_after}
+        return await request("GET", url, params=params, cache_family=cache_family)
+
+    queue = deque([[path, 1, None]]) if pending is None else pending
+    running = {}
+    try:
+        while queue or running:
+            while queue and len(running) < concurrency:
+                entry = queue.popleft()
+                running[asyncio.ensure_future(list_directory(entry[0]))] = entry
+            done, _ = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                directory, depth, skip = entry = running.pop(task)
+                response = task.result()
+                if not response.is_success:
+                    yield entry, [{"path": directory, "error": response.text}]
+                    continue
+                objects = response.json().get("objects", [])
+                if skip is not None:
+                    yield entry, objects[skip:]
+                    continue
+                if max_depth is None or depth < max_depth:
+                    queue.extend(
+                        [obj["path"], depth + 1, None] for obj in objects
+                        if obj.get("object_type") in ("DIRECTORY", "REPO")
+                    )
+                yield entry, objects
+    finally:
+        for task, entry in running.items():
+            task.cancel()
+            queue.appendleft(entry)
+
+def decode_walk_cursor(cursor: str) -> deque:
+    """Decode the directories left to list by list_workspace_objects_recursive"""
+    try:
+        pending = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        valid = isinstance(pending, list) and all(
+            isinstance(directory, str) and type(depth) is int and depth >= 1 and (skip is None or type(skip) is int and skip >= 0)
+            for directory, depth, skip in pending
+        )
+    except (ValueError, TypeError):
+        valid = False
+    if not valid:
+        raise ValueError(f"Invalid cursor {cursor!r}, pass the next_cursor of a previous call")
+    return deque(pending)
+
+@tool(tags=["workspace", "databricks_workspace", "workspace"])
+async def list_workspace_objects_recursive(
+    path: str,
+    max_depth: Annotated[Optional[int] | None, "Optional. Maximum depth to descend, 1 only lists `path` itself. Unlimited if not specified"] = None,
+    concurrency: Annotated[int, Field(ge=1, description="Number of directories listed in parallel")] = 8,
+    notebooks_modified_after: Annotated[int | None, "Optional. UTC timestamp in milliseconds. Only notebooks modified after it are returned, directories are always traversed"] = None,
+    fields: Annotated[Optional[List[str]] | None, "Optional. Only return these fields of each object, e.g. ['path', 'object_type']. Dotted names select nested fields"] = None,
+    limit: Annotated[int, Field(ge=0, description="Maximum number of objects to return, pass the returned next_cursor to get the next ones")] = 1000,
+    cursor: Annotated[Optional[str] | None, "Optional. next_cursor of a previous call with the same arguments, to continue the listing where it stopped"] = None,
+    ctx: Context | None = None,
     ) -> str:
-    """Set cluster policy permissions"""
-    url = f"/api/2.0/permissions/cluster-policies/{cluster_policy_id}"
-    data = {"access_control_list": access_control_list}
-    response = requests.put(databricks_host + url, headers=headers, json=data)
-    return response.text
+    """Recursively list workspace objects, one JSON object per line, the last one being {"next_cursor": ...} if more remain"""
+    pending = decode_walk_cursor(cursor) if cursor else deque([[path, 1, None]])
+    lines = []
+    directories = 0
+    partial = None
+    if limit:
+        async with aclosing(walk_workspace(path, max_depth, concurrency, notebooks_modified_after, pending=pending)) as listings:
+            async for (directory, depth, skip), objects in listings:
+                directories += 1
+                taken = objects[:limit - len(lines)]
+                lines.extend(json.dumps(pick(obj, fields) if fields and "error" not in obj else obj, separators=(",", ":")) for obj in taken)
+                if len(taken) < len(objects):
+                    partial = [directory, depth, (skip or 0) + len(taken)]
+                    break
+                if ctx is not None:
+                    await ctx.report_progress(directories, message=f"{len(lines)} objects in {directories} directories")
+                if len(lines) == limit:
+                    break
+    if partial is not None:
+        pending.appendleft(partial)
+    if pending:
+        lines.append(json.dumps({"next_cursor": base64.urlsafe_b64encode(dumps(list(pending)).encode()).decode()}))
+    return "\n".join(lines)
 
-@mcp.tool(tags=["workspace", "compute", "cluster_policies"])
-def update_cluster_policy_permissions(
-    cluster_policy_id: str,
-    access_control_list: Annotated[Optional[List[AccessControlEntry]] | None, "Optional. List of access control entries"] = None,
+index_connection: sqlite3.Connection | None = None
+
+def open_index() -> sqlite3.Connection:
+    """Open the local workspace index, creating it on first use"""
+    global index_connection
+    if index_connection is None:
+        os.makedirs(os.path.dirname(os.path.abspath(index_path)), exist_ok=True)
+        index_connection = sqlite3.connect(index_path)
+        index_connection.row_factory = sqlite3.Row
+        index_connection.executescript("""
+            CREATE TABLE IF NOT EXISTS objects (
+                path TEXT PRIMARY KEY,
+                object_id INTEGER,
+                object_type TEXT,
+                language TEXT,
+                modified_at INTEGER,
+                indexed_at INTEGER NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS objects_type_language ON objects (object_type, language);
+            CREATE TABLE IF NOT EXISTS crawls (
+                root TEXT PRIMARY KEY,
+                started_at INTEGER NOT NULL
+            );
+        """)
+    return index_connection
+
+def subtree_condition(root: str) -> tuple[str, list]:
+    """SQL condition matching `root` and every path below it, using the primary key index"""
+    prefix = root.rstrip("/") + "/"
+    return "(path = ? OR (path >= ? AND path < ?))", [root, prefix, prefix[:-1] + "0"]
+
+@tool(tags=["workspace", "databricks_workspace", "workspace"])
+async def refresh_workspace_index(
+    path: Annotated[str, "Root of the workspace tree to index"] = "/",
+    full: Annotated[bool, "Re-crawl everything and drop deleted objects instead of only fetching notebooks modified since the last refresh of `path`"] = False,
+    concurrency: Annotated[int, Field(ge=1, description="Number of directories listed in parallel")] = 8,
+    ctx: Context | None = None,
     ) -> str:
-    """Update cluster policy permissions"""
-    url = f"/api/2.0/permissions/cluster-policies/{cluster_policy_id}"
-    data = {"access_control_list": access_control_list}
-    response = requests.patch(databricks_host + url, headers=headers, json=data)
-    return response.text
+    """Crawl the workspace into the local index used by search_workspace_index"""
+    connection = open_index()
+    started_at = int(time.time() * 1000)
+    last_crawl = connection.execute("SELECT started_at FROM crawls WHERE root = ?", (path,)).fetchone()
+    full = full or last_crawl is None
+    modified_after = None if full else last_crawl["started_at"]
+    indexed = directories = 0
+    errors = []
+    async with aclosing(walk_workspace(path, None, concurrency, modified_after, cache_family=None)) as listings:
+        async for _, objects in listings:
+            directories += 1
+            errors.extend(obj for obj in objects if "error" in obj)
+            rows = [
+                (obj["path"], obj.get("object_id"), obj.get("object_type"), obj.get("language"), obj.get("modified_at"), started_at)
+                for obj in objects if "error" not in obj
+            ]
+            connection.executemany("INSERT OR REPLACE INTO objects VALUES (?, ?, ?, ?, ?, ?)", rows)
+            indexed += len(rows)
+            if ctx is not None:
+                await ctx.report_progress(directories, message=f"{indexed} objects indexed")
+    removed = 0
+    # A failed listing would make its whole subtree look deleted
+    if full and not errors:
+        condition, args = subtree_condition(path)
+        removed = connection.execute(f"DELETE FROM objects WHERE {condition} AND indexed_at < ?", [*args, started_at]).rowcount
+    if not errors:
+        connection.execute("INSERT OR REPLACE INTO crawls VALUES (?, ?)", (path, started_at))
+    connection.commit()
+    return json.dumps({
+        "root": path,
+        "mode": "full" if full else "incremental",
+        "directories": directories,
+        "indexed": indexed,
+        "removed": removed,
+        "errors": errors,
+    })
 
-@mcp.tool(tags=["workspace", "compute", "cluster_policies"])
-def get_cluster_policy_permission_levels(
-    cluster_policy_id: str,
+@tool(tags=["workspace", "databricks_workspace", "workspace"])
+async def search_workspace_index(
+    query: Annotated[str, "Text to match against object paths"],
+    mode: Annotated[Literal["substring", "prefix", "glob"], "substring: case-insensitive match anywhere in the path, prefix: paths starting with query, glob: case-sensitive pattern such as /Users/*/etl_*"] = "substring",
+    object_type: Annotated[Optional[Literal["NOTEBOOK", "DIRECTORY", "LIBRARY", "FILE", "REPO", "DASHBOARD"]] | None, "Optional. Only return objects of this type"] = None,
+    language: Annotated[Optional[Literal["SCALA", "PYTHON", "SQL", "R"]] | None, "Optional. Only return notebooks in this language"] = None,
+    limit: Annotated[int, Field(ge=0, description="Maximum number of objects to return")] = 100,
     ) -> str:
-    """Get cluster policy permission levels"""
-    url = f"/api/2.0/permissions/cluster-policies/{cluster_policy_id}/permissionLevels"
-    response = requests.get(databricks_host + url, headers=headers)
-    return response.text
+    """Search workspace objects in the local index built by refresh_workspace_index"""
+    connection = open_index()
+    if mode == "prefix":
+        conditions, args = ["path >= ? AND path < ?"], [query, query + "\U0010ffff"]
+    elif mode == "glob":
+        conditions, args = ["path GLOB ?"], [query]
+    else:
+        escaped = query.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+        conditions, args = ["path LIKE ? ESCAPE '\\'"], [f"%{escaped}%"]
+    if object_type is not None:
+        conditions.append("object_type = ?")
+        args.append(object_type)
+    if language is not None:
+        conditions.append("language = ?")
+        args.append(language)
+    rows = connection.execute(
+        f"SELECT path, object_id, object_type, language, modified_at FROM objects WHERE {' AND '.join(conditions)} ORDER BY path LIMIT ?",
+        [*args, limit],
+    ).fetchall()
+    return json.dumps({"objects": [{key: row[key] for key in row.keys() if row[key] is not None} for row in rows]})
+
+notebook_extensions = {"PYTHON": ".py", "SCALA": ".scala", "SQL": ".sql", "R": ".r"}
+format_extensions = {"JUPYTER": ".ipynb", "HTML": ".html", "DBC": ".dbc", "R_MARKDOWN": ".Rmd"}
+manifest_name = ".databricks-manifest.json"
+
+def load_manifest(local_dir: str) -> dict:
+    """Read the sync manifest of a local directory, mapping relative file paths to workspace objects"""
+    try:
+        with open(os.path.join(local_dir, manifest_name)) as file:
+            return json.load(file)
+    except FileNotFoundError:
+        return {"files": {}}
+
+def save_manifest(local_dir: str, manifest: dict) -> None:
+    manifest_path = os.path.join(local_dir, manifest_name)
+    with open(manifest_path + ".part", "w") as file:
+        json.dump(manifest, file, indent=1, sort_keys=True)
+    os.replace(manifest_path + ".part", manifest_path)
+
+def file_sha256(local_path: str) -> str:
+    digest = hashlib.sha256()
+    with open(local_path, "rb") as file:
+        for chunk in iter(lambda: file.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+async def run_transfers(
+    transfers: AsyncIterator[tuple[str, Any]],
+    transfer: Callable[[Any], Awaitable[str]],
+    concurrency: int,
+    local_dir: str,
+    manifest: dict,
+    ctx: Context | None,
+    ) -> dict:
+    """Run `transfer(item)` for each (name, item) with bounded concurrency and report per-file progress
 
-@mcp.tool(tags=["workspace", "compute", "cluster_policies"])
-def create_cluster_policy(
-    name: str,
-    definition: Annotated[Optional[dict] | None, "Optional. Dictionary containing policy definition. Example: {'custom_tags.test_tag': {'type': 'fixed', 'value': 'test_value'}}"] = None,    
-    description: Annotated[Optional[str] | None, "Optional. Description of the cluster policy."] = None,
-    libraries: Annotated[Optional[List[str]] | None, "Optional. List of libraries to be installed on the cluster."] = None,
-    max_clusters_per_user: Annotated[Optional[int] | None, "Optional. Maximum number of clusters that a user can create with this policy."] = None,
-    policy_family_definition_overrides: Annotated[Optional[dict] | None, "Optional. JSON string containing overrides for the policy family definition."] = None,
-    policy_family_id: Annotated[Optional[str] | None, "Optional. ID of the policy family to which this cluster policy belongs."] = None,
+    `transfer` returns "skipped" or "transferred". The manifest is saved every 50 files,
+    and once more at the end even on failure, so an interrupted run can resume from it.
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+    summary = {"transferred": 0, "skipped": 0, "failed": []}
+    tasks = []
+    finished = 0
+
+    async def run(name: str, item: Any) -> None:
+        nonlocal finished
+        async with semaphore:
+            try:
+                summary[await transfer(item)] += 1
+            except Exception as error:
+                summary["failed"].append({"path": name, "error": str(error)})
+        finished += 1
+        if finished % 50 == 0:
+            save_manifest(local_dir, manifest)
+        if ctx is not None:
+            await ctx.report_progress(finished, len(tasks), message=name)
+
+    try:
+        async for name, item in transfers:
+            tasks.append(asyncio.ensure_future(run(name, item)))
+        await asyncio.gather(*tasks)
+    finally:
+        for task in tasks:
+            task.cancel()
+        save_manifest(local_dir, manifest)
+    return summary
+
+@tool(tags=["workspace", "databricks_workspace", "workspace"])
+async def export_workspace_directory(
+    path: Annotated[str, "Workspace directory to export"],
+    local_dir: Annotated[str, "Local directory to export into. Created if missing"],
+    format: Annotated[Literal["SOURCE", "HTML", "JUPYTER", "DBC", "R_MARKDOWN"], "Export format for notebooks. Files are always exported as is"] = "SOURCE",
+    concurrency: Annotated[int, Field(ge=1, description="Number of objects exported in parallel")] = 8,
+    ctx: Context | None = None,
     ) -> str:
-    """Create a cluster policy"""
-    url = "/api/2.0/policies/clusters/create"
-    data = {
-        "name": name,
-        "definition": definition,
-        "description": description,
-        "libraries": libraries,
-        "max_clusters_per_user": max_clusters_per_user,
-        "policy_family_definition_overrides": policy_family_definition_overrides,
-        "policy_family_id": policy_family_id,
-    }
-    response = requests.post(databricks_host + url, headers=headers, json=data)
-    return response.text
+    """Export a workspace directory recursively into a local directory tree
 
-@mcp.tool(tags=["workspace", "compute", "cluster_policies"])
-def delete_cluster_policy(policy_id: str) -> str:
-    """Delete a cluster policy"""
-    url = "/api/2.0/policies/clusters/delete"
-    data = {"cluster_policy_id": policy_id}
-    response = requests.post(databricks_host + url, headers=headers, json=data)
-    return response.text
+    Objects whose modification time matches the local manifest are skipped, so re-running
+    an interrupted or earlier export only transfers what changed.
+    """
+    local_dir = local_file(local_dir)
+    os.makedirs(local_dir, exist_ok=True)
+    manifest = load_manifest(local_dir)
+    url = "/api/2.0/workspace/export"
+    root = path.rstrip("/")
+
+    async def exports() -> AsyncIterator[tuple[str, dict]]:
+        async with aclosing(walk_workspace(path, None, concurrency, cache_family=None)) as listings:
+            async for _, objects in listings:
+                for obj in objects:
+                    if "error" in obj:
+                        raise RuntimeError(f"Cannot list {obj['path']}: {obj['error']}")
+                    if obj.get("object_type") in ("NOTEBOOK", "FILE"):
+                        yield obj["path"], obj
+
+    async def export(obj: dict) -> str:
+        relative_path = obj["path"][len(root) + 1:]
+        if obj["object_type"] == "NOTEBOOK":
+            object_format = format
+            relative_path += notebook_extensions.get(obj.get("language"), "") if format == "SOURCE" else format_extensions[format]
+        else:
+            object_format = "AUTO"
+        local_path = os.path.join(local_dir, relative_path)
+        entry = manifest["files"].get(relative_path)
+        if (
+            entry is not None
+            and entry["modified_at"] == obj.get("modified_at")
+            and entry["format"] == object_format
+            and os.path.exists(local_path)
+            and os.path.getsize(local_path) == entry["bytes"]
+        ):
+            return "skipped"
+        params = {"path": obj["path"], "format": object_format, "direct_download": True}
+        result = await download(url, params, local_path, export_max_bytes)
+        if isinstance(result, httpx.Response):
+            raise RuntimeError(result.text)
+        manifest["files"][relative_path] = {
+            "path": obj["path"],
+            "name": obj["path"][len(root) + 1:],
+            "object_type": obj["object_type"],
+            "language": obj.get("language"),
+            "format": object_format,
+            "modified_at": obj.get("modified_at"),
+            "bytes": result["bytes"],
+            "sha256": result["sha256"],
+        }
+        return "transferred"
+
+    summary = await run_transfers(exports(), export, concurrency, local_dir, manifest, ctx)
+    return json.dumps({"path": path, "local_dir": local_dir, **summary})
 
-@mcp.tool(tags=["workspace", "compute", "cluster_policies"])
-def update_cluster_policy(
-    policy_id: str,
-    name: Annotated[Optional[str] | None, "Optional. Name of the cluster policy."] = None,
-    definition: Annotated[Optional[dict] | None, "Optional. Dictionary containing policy definition. Example: {'custom_tags.test_tag': {'type': 'fixed', 'value': 'test_value'}}"] = None,    
-    description: Annotated[Optional[str] | None, "Optional. Description of the cluster policy."] = None,
-    libraries: Annotated[Optional[List[str]] | None, "Optional. List of libraries to be installed on the cluster."] = None,
-    max_clusters_per_user: Annotated[Optional[int] | None, "Optional. Maximum number of clusters that a user can create with this policy."] = None,
-    policy_family_definition_overrides: Annotated[Optional[dict] | None, "Optional. JSON string containing overrides for the policy family definition."] = None,
+@tool(tags=["workspace", "databricks_workspace", "workspace"])
+async def import_workspace_directory(
+    local_dir: Annotated[str, "Local directory to import"],
+    path: Annotated[str, "Workspace directory to import into. Created if missing"],
+    overwrite: Annotated[bool, "Overwrite existing workspace objects, otherwise files whose object already exists are reported as failed"] = False,
+    concurrency: Annotated[int, Field(ge=1, description="Number of files imported in parallel")] = 8,
+    ctx: Context | None = None,
     ) -> str:
-    """Update a cluster policy"""
-    url = "/api/2.0/policies/clusters/edit"
-    data = {
-        "policy_id": policy_id,
-        "name": name,
-        "definition": definition,
-        "description": description,
-        "libraries": libraries,
-        "max_clusters_per_user": max_clusters_per_user,
-        "policy_family_definition_overrides": policy_family_definition_overrides,
-    }
-    response = requests.post(databricks_host + url, headers=headers, json=data)
-    return response.text
+    """Import a local directory tree recursively into a workspace directory
+
+    Files exported by export_workspace_directory are imported back as the object type,
+    language and format recorded in the manifest. Other files with a notebook extension
+    (.py, .scala, .sql, .r) become SOURCE notebooks without the extension, .ipynb, .html,
+    .dbc and .Rmd files are imported in their format and anything else as a workspace file.
+    Files whose content already matches the manifest for the same workspace path are skipped.
+    """
+    local_dir = local_file(local_dir)
+    manifest = load_manifest(local_dir)
+    root = path.rstrip("/")
+    formats_by_extension = {extension: object_format for object_format, extension in format_extensions.items()}
+    languages_by_extension = {extension: language for language, extension in notebook_extensions.items()}
+    created_directories: dict[str, asyncio.Task] = {}
+
+    async def ensure_directory(directory: str) -> None:
+        if directory not in created_directories:
+            created_directories[directory] = asyncio.ensure_future(
+                request("POST", "/api/2.0/workspace/mkdirs", json={"path": directory}, invalidates=["workspace"])
+            )
+        response = await created_directories[directory]
+        if not response.is_success:
+            raise RuntimeError(response.text)
+
+    async def imports() -> AsyncIterator[tuple[str, str]]:
+        for directory, _, file_names in os.walk(local_dir):
+            for file_name in sorted(file_names):
+                if file_name == manifest_name or file_name.endswith(".part"):
+                    continue
+                relative_path = os.path.relpath(os.path.join(directory, file_name), local_dir).replace(os.sep, "/")
+                yield relative_path, relative_path
 
-@mcp.tool(tags=["workspace", "compute", "cluster_policies"])
-def get_cluster_policy(policy_id: str) -> str:
-    """Get a cluster policy"""
-    url = f"/api/2.0/policies/cluster/get"
-    params = {"cluster_policy_id": policy_id}
-    response = requests.get(databricks_host + url, headers=headers, params=params)
+    async def import_file(relative_path: str) -> str:
+        local_path = os.path.join(local_dir, relative_path)
+        entry = manifest["files"].get(relative_path)
+        stem, extension = os.path.splitext(relative_path)
+        if entry is not None:
+            object_path, object_format, language = f"{root}/{entry['name']}", entry["format"], entry["language"]
+        elif extension in languages_by_extension:
+            object_path, object_format, language = f"{root}/{stem}", "SOURCE", languages_by_extension[extension]
+        elif extension in formats_by_extension:
+            object_path, object_format, language = f"{root}/{stem}", formats_by_extension[extension], None
+        else:
+            object_path, object_format, language = f"{root}/{relative_path}", "AUTO", None
+        sha256 = file_sha256(local_path)
+        if entry is not None and entry["sha256"] == sha256 and entry["path"] == object_path:
+            return "skipped"
+        await ensure_directory(object_path.rsplit("/", 1)[0] or "/")
+        response = await upload(object_path, local_path, object_format, language, overwrite)
+        if not response.is_success:
+            raise RuntimeError(response.text)
+        manifest["files"][relative_path] = {
+            "path": object_path,
+            "name": object_path[len(root) + 1:],
+            "object_type": entry["object_type"] if entry else ("FILE" if object_format == "AUTO" else "NOTEBOOK"),
+            "language": language,
+            "format": object_format,
+            "modified_at": entry["modified_at"] if entry else None,
+            "bytes": os.path.getsize(local_path),
+            "sha256": sha256,
+        }
+        return "transferred"
+
+    summary = await run_transfers(imports(), import_file, concurrency, local_dir, manifest, ctx)
+    return json.dumps({"local_dir": local_dir, "path": path, **summary})
+
+@tool(tags=["workspace", "compute", "cluster_policies"])
+async def set_cluster_policy_permissions(
+    cluster_policy_id: str,
+    access_control_list: Annotated[Optional[List[AccessControlEntry]] | None, "Optional. List of access control entries"] = None,
+    reconcile: Annotated[bool, "Only write when the current permissions differ, sending the smallest change, and return a report of the changes"] = False,
+    ) -> str:
+    """Set cluster policy permissions"""
+    if reconcile:
+        return json.dumps(await reconcile_acl("cluster-policies", cluster_policy_id, access_control_list or []))
+    url = f"/api/2.0/permissions/cluster-policies/{cluster_policy_id}"
+    data = {"access_control_list": access_control_list}
+    response = await request("PUT", url, json=data, invalidates=["permissions"])
     return response.text
 
-@mcp.tool(tags=["workspace", "compute", "cluster_policies"])
-def list_cluster_policies(
+@tool(tags=["workspace", "compute", "cluster_policies"])
+async def list_cluster_policies(
     sort_order: Annotated[Optional[Literal["ASC", "DESC"]] | None, "Optional. Sort order of the cluster policies."] = None,
     sort_column: Annotated[Optional[Literal["POLICY_CREATION_TIME", "POLICY_NAME"]] | None, "Optional. Column to sort the cluster policies by."] = None,
+    fields: Annotated[Optional[List[str]] | None, "Optional. Only return these fields of each policy, e.g. ['policy_id', 'name'] to leave out the definition. Dotted names select nested fields"] = None,
+    limit: Annotated[Optional[int] | None, Field(ge=0, description="Optional. Maximum number of cluster policies to return")] = None,
+    compact: Annotated[bool, "Serialise the result without whitespace"] = True,
 ) -> str:
     """List all cluster policies"""
-    url = "/api/2.0/policies/cluster/list"
+    url = "/api/2.0/policies/clusters/list"
     params = {
         "sort_order": sort_order,
         "sort_column": sort_column
     }
-    response = requests.get(databricks_host + url, headers=headers, params=params)
-    return response.text
+    response = await request("GET", url, params=params, cache_family="cluster_policies")
+    if not response.is_success or (fields is None and limit is None and not compact):
+        return response.text
+    return project(response.json(), "policies", fields, limit, compact)
+
+# Attributes computed by Databricks when the cluster is created, they cannot be checked from a spec
+virtual_policy_attributes = {"dbus_per_hour", "cluster_type"}
+
+def same_value(value: Any, expected: Any) -> bool:
+    """Compare a spec value with a policy value, which are often strings for numbers and booleans"""
+    if value == expected:
+        return True
+    return isinstance(value, str) != isinstance(expected, str) and str(value).lower() == str(expected).lower()
+
+class PolicyRule:
+    """One compiled rule of a cluster policy definition"""
+
+    def __init__(self, path: str, rule: dict):
+        self.path = path
+        self.type = rule.get("type", "unlimited")
+        self.value = rule.get("value")
+        self.values = rule.get("values", [])
+        self.pattern = re.compile(rule["pattern"]) if self.type == "regex" else None
+        self.min_value = rule.get("minValue")
+        self.max_value = rule.get("maxValue")
+        self.default = rule.get("defaultValue", self.value if self.type == "fixed" else None)
+        self.required = (
+            self.type in ("allowlist", "blocklist", "regex", "range", "unlimited")
+            and not rule.get("isOptional", False)
+            and self.default is None
+        )
+
+    def check(self, value: Any) -> str | None:
+        """Return why `value` breaks the rule, or None when it is allowed"""
+        if self.type == "fixed" and not same_value(value, self.value):
+            return f"must be {self.value!r}"
+        if self.type == "forbidden":
+            return "is forbidden"
+        if self.type == "allowlist" and not any(same_value(value, allowed) for allowed in self.values):
+            return f"must be one of {self.values!r}"
+        if self.type == "blocklist" and any(same_value(value, blocked) for blocked in self.values):
+            return f"must not be one of {self.values!r}"
+        if self.type == "regex" and not self.pattern.fullmatch(str(value)):
+            return f"must match {self.pattern.pattern!r}"
+        if self.type == "range":
+            try:
+                number = float(value)
+            except (TypeError, ValueError):
+                return "must be a number"
+            if self.min_value is not None and number < self.min_value:
+                return f"must be at least {self.min_value}"
+            if self.max_value is not None and number > self.max_value:
+                return f"must be at most {self.max_value}"
+        return None
+
+class CompiledPolicy:
+    """Rules of a cluster policy indexed by attribute path, with a regex per wildcard path such as init_scripts.*.volumes.destination"""
+
+    def __init__(self, definition: dict):
+        self.rules: dict[str, PolicyRule] = {}
+        self.wildcard_rules: list[tuple[re.Pattern, PolicyRule]] = []
+        for path, rule in definition.items():
+            compiled = PolicyRule(path, rule)
+            if "*" in path:
+                # A forbidden object forbids every attribute below it
+                subtree = r"(\..+)?" if compiled.type == "forbidden" else ""
+                pattern = re.compile(r"[^.]+".join(re.escape(part) for part in path.split("*")) + subtree)
+                self.wildcard_rules.append((pattern, compiled))
+            else:
+                self.rules[path] = compiled
+        self.forbidden = {path for path, rule in self.rules.items() if rule.type == "forbidden"}
+
+    def matching(self, key: str) -> Iterator[PolicyRule]:
+        if key in self.rules:
+            yield self.rules[key]
+        if self.forbidden:
+            parts = key.split(".")
+            for end in range(1, len(parts)):
+                prefix = ".".join(parts[:end])
+                if prefix in self.forbidden:
+                    yield self.rules[prefix]
+        for pattern, rule in self.wildcard_rules:
+            if pattern.fullmatch(key):
+                yield rule
+
+    def fill(self, attributes: dict[str, Any]) -> dict[str, Any]:
+        """Add the fixed and default values of the attributes missing from the spec"""
+        filled = dict(attributes)
+        for path, rule in self.rules.items():
+            if rule.default is not None and path not in filled and path not in virtual_policy_attributes:
+                filled[path] = rule.default
+        return filled
+
+    def evaluate(self, attributes: dict[str, Any]) -> dict:
+        violations = []
+        seen = set()
+        for key, value in attributes.items():
+            for rule in self.matching(key):
+                seen.add(rule.path)
+                message = rule.check(value)
+                if message is not None:
+                    violations.append({"path": key, "type": rule.type, "message": f"{key} {message}"})
+        not_evaluated = []
+        for path, rule in self.rules.items():
+            if path in seen:
+                continue
+            if path in virtual_policy_attributes:
+                not_evaluated.append(path)
+            elif rule.required:
+                violations.append({"path": path, "type": rule.type, "message": f"{path} is required by the policy"})
+        return {"valid": not violations, "violations": violations, "not_evaluated": not_evaluated}
+
+def flatten_spec(spec: Any, prefix: str = "") -> dict[str, Any]:
+    """Flatten a cluster spec into the dotted attribute paths of policy definitions, with list items by index"""
+    if isinstance(spec, dict):
+        items = spec.items()
+    elif isinstance(spec, list):
+        items = enumerate(spec)
+    else:
+        return {prefix: spec}
+    attributes = {}
+    for key, value in items:
+        attributes.update(flatten_spec(value, f"{prefix}.{key}" if prefix else str(key)))
+    return attributes
+
+# Maps whose keys contain dots, e.g. spark_conf.spark.databricks.cluster.profile
+map_attributes = ("spark_conf", "spark_env_vars", "custom_tags")
+
+def unflatten_spec(attributes: dict[str, Any]) -> Any:
+    """Rebuild a cluster spec from attribute paths"""
+    spec: dict = {}
+    for path, value in attributes.items():
+        head, _, rest = path.partition(".")
+        keys = [head, rest] if head in map_attributes and rest else path.split(".")
+        target = spec
+        for key in keys[:-1]:
+            target = target.setdefault(key, {})
+        target[keys[-1]] = value
+    return restore_lists(spec)
+
+def restore_lists(value: Any) -> Any:
+    """Turn the objects keyed by list index back into lists"""
+    if not isinstance(value, dict):
+        return value
+    items = {key: restore_lists(item) for key, item in value.items()}
+    if items and all(key.isdigit() for key in items):
+        return [items[key] for key in sorted(items, key=int)]
+    return items
+
+# Compiled policies by workspace and policy id, with the definition they were compiled from
+compiled_policies: dict[tuple[str, str], tuple[str, CompiledPolicy]] = {}
+
+def compile_policy(policy: dict) -> CompiledPolicy:
+    """Compile a policy definition once, and again only when the definition changes"""
+    key = (current_workspace.get().name, policy["policy_id"])
+    definition = policy.get("definition") or "{}"
+    entry = compiled_policies.get(key)
+    if entry is None or entry[0] != definition:
+        entry = (definition, CompiledPolicy(json.loads(definition) if isinstance(definition, str) else definition))
+        compiled_policies[key] = entry
+    return entry[1]
+
+@tool(tags=["workspace", "compute", "cluster_policies"])
+async def evaluate_cluster_policy(
+    cluster_spec: Annotated[dict, "Cluster spec as sent to the clusters create API, e.g. {'spark_version': '15.4.x-scala2.12', 'node_type_id': 'm5.large', 'num_workers': 2}"],
+    policy_id: Annotated[Optional[str] | None, "Optional. Policy to check the spec against, all cluster policies if not specified"] = None,
+    fill: Annotated[bool, "Add the fixed and default values of the policy to the spec before checking it, and return the filled spec"] = False,
+    ) -> str:
+    """Check a cluster spec against one or all cluster policies locally, listing the violations of each policy"""
+    response = await request("GET", "/api/2.0/policies/clusters/list", cache_family="cluster_policies")
+    if not response.is_success:
+        return response.text
+    policies = response.json().get("policies", [])
+    if policy_id is not None:
+        policies = [policy for policy in policies if policy["policy_id"] == policy_id]
+        if not policies:
+            raise ValueError(f"Cluster policy {policy_id} not found")
+    attributes = flatten_spec(cluster_spec)
+    results = []
+    for policy in policies:
+        compiled = compile_policy(policy)
+        policy_attributes = compiled.fill(attributes) if fill else attributes
+        result = {"policy_id": policy["policy_id"], "name": policy.get("name"), **compiled.evaluate(policy_attributes)}
+        if fill:
+            result["cluster_spec"] = unflatten_spec(policy_attributes)
+        results.append(result)
+    results.sort(key=lambda result: (not result["valid"], len(result["violations"])))
+    return json.dumps({"policies": results})
+
+class PermissionTarget(BaseModel):
+    object_type: Annotated[str, "Permissions object type, e.g. notebooks, directories, files, repos, cluster-policies"]
+    object_id: str
+
+workspace_permission_types = {"NOTEBOOK": "notebooks", "DIRECTORY": "directories", "FILE": "files", "REPO": "repos"}
+principal_keys = {"user_name": "user", "group_name": "group", "service_principal_name": "service_principal"}
+
+def principal_of(entry: dict) -> tuple[str, str]:
+    """Return the (principal_type, principal) an access control entry applies to"""
+    for key, principal_type in principal_keys.items():
+        if entry.get(key):
+            return principal_type, entry[key]
+    return "unknown", ""
+
+async def workspace_permission_targets(path: str, concurrency: int) -> AsyncIterator[tuple[PermissionTarget, str]]:
+    """Yield the permission target and path of `path` and of every object below it"""
+    response = await request("GET", "/api/2.0/workspace/get-status", params={"path": path}, cache_family="workspace")
+    if not response.is_success:
+        raise RuntimeError(response.text)
+    root = response.json()
+    if root["object_type"] not in workspace_permission_types:
+        raise ValueError(f"{root['path']} is a {root['object_type']}, which has no permissions, pass a notebook, directory, file or repo")
+    yield PermissionTarget(object_type=workspace_permission_types[root["object_type"]], object_id=str(root["object_id"])), root["path"]
+    if root["object_type"] not in ("DIRECTORY", "REPO"):
+        return
+    async with aclosing(walk_workspace(path, None, concurrency)) as listings:
+        async for _, objects in listings:
+            for obj in objects:
+                if "error" in obj:
+                    raise RuntimeError(f"Cannot list {obj['path']}: {obj['error']}")
+                if obj.get("object_type") in workspace_permission_types:
+                    target = PermissionTarget(object_type=workspace_permission_types[obj["object_type"]], object_id=str(obj["object_id"]))
+                    yield target, obj["path"]
+
+async def fetch_permissions(
+    targets: AsyncIterator[tuple[PermissionTarget, str | None]],
+    concurrency: int,
+    ) -> dict:
+    """Fetch the permissions of every target concurrently into one compact table"""
+    semaphore = asyncio.Semaphore(concurrency)
+    rows = []
+    errors = []
+
+    async def fetch(target: PermissionTarget, path: str | None) -> None:
+        url = f"/api/2.0/permissions/{target.object_type}/{target.object_id}"
+        async with semaphore:
+            response = await request("GET", url, cache_family="permissions")
+        if not response.is_success:
+            errors.append({"object_type": target.object_type, "object_id": target.object_id, "path": path, "error": response.text})
+            return
+        for entry in response.json().get("access_control_list", []):
+            principal_type, principal = principal_of(entry)
+            for permission in entry.get("all_permissions", []):
+                rows.append([
+                    target.object_type, target.object_id, path, principal_type, principal,
+                    permission.get("permission_level"), permission.get("inherited", False),
+                ])
+
+    tasks = []
+    try:
+        async for target, path in targets:
+            tasks.append(asyncio.ensure_future(fetch(target, path)))
+        await asyncio.gather(*tasks)
+    finally:
+        for task in tasks:
+            task.cancel()
+    return {
+        "columns": ["object_type", "object_id", "path", "principal_type", "principal", "permission_level", "inherited"],
+        "rows": rows,
+        "errors": errors,
+    }
+
+@tool(tags=["workspace", "identity_and_access_management", "permissions"])
+async def get_permissions_batch(
+    objects: Annotated[Optional[List[PermissionTarget]] | None, "Optional. Objects to fetch permissions for"] = None,
+    path_prefix: Annotated[Optional[str] | None, "Optional. Workspace path whose object and every object below it are included"] = None,
+    concurrency: Annotated[int, Field(ge=1, description="Number of permission requests in flight at once")] = 16,
+    ) -> str:
+    """Get the permissions of many objects at once as one table of principal and permission level per object"""
+    if objects is None and path_prefix is None:
+        raise ValueError("Pass objects, path_prefix or both")
+
+    async def targets() -> AsyncIterator[tuple[PermissionTarget, str | None]]:
+        for target in objects or []:
+            yield target, None
+        if path_prefix is not None:
+            async with aclosing(workspace_permission_targets(path_prefix, concurrency)) as workspace_targets:
+                async for target, path in workspace_targets:
+                    yield target, path
+
+    return json.dumps(await fetch_permissions(targets(), concurrency))
+
+async def reconcile_acl(
+    object_type: str,
+    object_id: str,
+    access_control_list: List[AccessControlEntry],
+    dry_run: bool = False,
+    path: str | None = None,
+    ) -> dict:
+    """Make the direct permissions of an object match `access_control_list` with the smallest write
+
+    Nothing is written when the ACL already matches. Added or changed entries are sent with
+    PATCH, and only when a principal has to lose its direct permission is the full list PUT.
+    """
+    url = f"/api/2.0/permissions/{object_type}/{object_id}"
+    report = {"object_type": object_type, "object_id": object_id, "path": path}
+    # Read around the cache, a stale ACL could skip a needed write
+    response = await request("GET", url)
+    if not response.is_success:
+        return {**report, "action": "error", "error": response.text}
+    current = {}
+    for entry in response.json().get("access_control_list", []):
+        for permission in entry.get("all_permissions", []):
+            if not permission.get("inherited"):
+                current[principal_of(entry)] = permission["permission_level"]
+    desired = {
+        principal_of(entry.model_dump()): entry
+        for entry in access_control_list if entry.permission_level is not None
+    }
+    changed = {principal: entry for principal, entry in desired.items() if current.get(principal) != entry.permission_level}
+    removed = [principal for principal in current if principal not in desired]
+    report["changes"] = [
+        {"principal_type": principal[0], "principal": principal[1], "from": current.get(principal), "to": entry.permission_level}
+        for principal, entry in changed.items()
+    ] + [
+        {"principal_type": principal[0], "principal": principal[1], "from": current[principal], "to": None}
+        for principal in removed
+    ]
+    if removed:
+        method, data = "PUT", {"access_control_list": list(desired.values())}
+    elif changed:
+        method, data = "PATCH", {"access_control_list": list(changed.values())}
+    else:
+        return {**report, "action": "unchanged"}
+    report["action"] = method.lower()
+    if dry_run:
+        return report
+    response = await request(method, url, json=data, invalidates=["permissions"])
+    if not response.is_success:
+        return {**report, "action": "error", "error": response.text}
+    return report
+
+@tool(tags=["workspace", "identity_and_access_management", "permissions"])
+async def reconcile_permissions(
+    access_control_list: Annotated[List[AccessControlEntry], "Desired direct permissions of every object"],
+    objects: Annotated[Optional[List[PermissionTarget]] | None, "Optional. Objects to apply the permissions to"] = None,
+    path_prefix: Annotated[Optional[str] | None, "Optional. Workspace path whose object and every object below it get the permissions"] = None,
+    dry_run: Annotated[bool, "Only report the changes that would be made"] = False,
+    concurrency: Annotated[int, Field(ge=1, description="Number of objects reconciled in parallel")] = 16,
+    ) -> str:
+    """Apply one desired ACL to many objects, writing only to objects whose permissions differ"""
+    if objects is None and path_prefix is None:
+        raise ValueError("Pass objects, path_prefix or both")
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def reconcile(target: PermissionTarget, path: str | None) -> dict:
+        async with semaphore:
+            return await reconcile_acl(target.object_type, target.object_id, access_control_list, dry_run, path)
+
+    tasks = [asyncio.ensure_future(reconcile(target, None)) for target in objects or []]
+    try:
+        if path_prefix is not None:
+            async with aclosing(workspace_permission_targets(path_prefix, concurrency)) as targets:
+                async for target, path in targets:
+                    tasks.append(asyncio.ensure_future(reconcile(target, path)))
+        reports = await asyncio.gather(*tasks)
+    finally:
+        for task in tasks:
+            task.cancel()
+    summary = {"unchanged": 0, "patch": 0, "put": 0, "error": 0}
+    for report in reports:
+        summary[report["action"]] += 1
+    return json.dumps({"dry_run": dry_run, "summary": summary, "objects": [report for report in reports if report["action"] != "unchanged"]})
+
+# Read-only tools that fan_out may run in every workspace
+fan_out_tools = {endpoint.name for endpoint in endpoints if endpoint.method == "GET"} | {
+    "get_repos",
+    "get_secret_inventory",
+    "list_workspace_objects",
+    "list_cluster_policies",
+    "get_permissions_batch",
+}
+
+def merge_workspace_results(results: dict[str, str]) -> dict:
+    """Merge the results of a tool from several workspaces
+
+    Lists of objects, such as the scopes of list_scopes, are concatenated with a `workspace` key added
+    to each object. Other values are kept per workspace and upstream errors are collected under `errors`.
+    """
+    merged: dict[str, Any] = {}
+    other: dict[str, dict] = {}
+    errors = []
+    for name, text in results.items():
+        try:
+            document = json.loads(text)
+        except ValueError:
+            document = text
+        if not isinstance(document, dict):
+            other[name] = {"result": document}
+            continue
+        if "error_code" in document:
+            errors.append({"workspace": name, **document})
+            continue
+        for key, value in document.items():
+            if isinstance(value, list) and all(isinstance(item, dict) for item in value):
+                merged.setdefault(key, []).extend({"workspace": name, **item} for item in value)
+            else:
+                other.setdefault(name, {})[key] = value
+    return {**merged, "workspaces": other, "errors": errors}
+
+@tool(tags=["workspace", "fan_out"])
+async def fan_out(
+    tool_name: Annotated[str, "Read-only tool to run, e.g. list_cluster_policies, list_scopes or get_repos"],
+    arguments: Annotated[Optional[dict] | None, "Optional. Arguments of the tool"] = None,
+    workspace_names: Annotated[Optional[List[str]] | None, "Optional. Workspaces to query, all configured workspaces by default"] = None,
+    ) -> str:
+    """Run the same read-only tool in several workspaces concurrently and merge the results, tagged by workspace"""
+    if tool_name not in fan_out_tools:
+        raise ValueError(f"{tool_name} is not a read-only tool, fan_out supports {', '.join(sorted(fan_out_tools))}")
+    unknown = set(workspace_names or []) - workspaces.keys()
+    if unknown:
+        raise ValueError(f"Unknown workspaces {', '.join(sorted(unknown))}, configured: {', '.join(workspaces)}")
+    selected = await mcp.get_tool(tool_name)
+    names = workspace_names or list(workspaces)
+
+    async def run(name: str) -> str:
+        # Runs in its own task, so the workspace only applies to this call and the tasks it starts
+        current_workspace.set(workspaces[name])
+        try:
+            result = await selected.run(arguments or {})
+        except Exception as error:
+            return json.dumps({"error_code": type(error).__name__, "message": str(error)})
+        return result.content[0].text if result.content else ""
+
+    results = await asyncio.gather(*(run(name) for name in names))
+    return json.dumps(merge_workspace_results(dict(zip(names, results))))
+
+async def close() -> None:
+    """Release the connection pool and the workspace index"""
+    for workspace in workspaces.values():
+        await workspace.client.aclose()
+    if index_connection is not None:
+        index_connection.close()
+
+async def drain(server: uvicorn.Server) -> None:
+    """Once the server is shutting down, wait for the tool calls in progress, then end the open SSE streams"""
+    while not server.should_exit:
+        await asyncio.sleep(0.1)
+    deadline = time.monotonic() + shutdown_timeout
+    while client_limiter.stats()["calls"] and time.monotonic() < deadline:
+        await asyncio.sleep(0.1)
+    AppStatus.should_exit = True
+
+def is_loopback(host: str) -> bool:
+    """Whether binding `host` only accepts connections from this machine"""
+    try:
+        return ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        return host == "localhost"
+
+async def serve_http() -> None:
+    """Serve many MCP clients over streamable HTTP from this process, sharing its connection pool and caches.
+
+    Clients must present DATABRICKS_MCP_TOKEN as a bearer token when it is set, which is
+    required to bind an address other than loopback.
+
+    On SIGINT/SIGTERM the server stops accepting connections and waits up to
+    DATABRICKS_SHUTDOWN_TIMEOUT seconds for tool calls in progress before closing the pool.
+    """
+    if server_token:
+        mcp.auth = StaticBearerToken(server_token)
+    elif not is_loopback(server_host):
+        raise RuntimeError(f"Set DATABRICKS_MCP_TOKEN to serve on {server_host}, clients outside this machine must authenticate")
+    # SSE streams would otherwise be closed as soon as the signal arrives, cutting off running tool calls
+    AppStatus.disable_automatic_graceful_drain()
+    app = mcp.http_app(transport="http")
+    sessions_lifespan = app.router.lifespan_context
+
+    # uvicorn re-raises the signal once it has stopped, so the pool is closed in the application shutdown
+    @asynccontextmanager
+    async def lifespan(app) -> AsyncIterator[None]:
+        async with sessions_lifespan(app):
+            yield
+        await close()
+
+    app.router.lifespan_context = lifespan
+    server = uvicorn.Server(uvicorn.Config(
+        app,
+        host=server_host,
+        port=server_port,
+        lifespan="on",
+        timeout_graceful_shutdown=shutdown_timeout,
+    ))
+    draining = asyncio.create_task(drain(server))
+    try:
+        await server.serve()
+    finally:
+        draining.cancel()
 
 if __name__ == "__main__":
-    mcp.run()
\ No newline at end of file
+    if transport == "http":
+        asyncio.run(serve_http())
+    else:
+        mcp.run()
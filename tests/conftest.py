@@ -0,0 +1,72 @@
+import asyncio
+import inspect
+import os
+import sys
+
+import httpx
+import pytest
+
+here = os.path.dirname(os.path.abspath(__file__))
+sys.path[:0] = [os.path.dirname(here), os.path.join(os.path.dirname(here), "benchmarks")]
+os.environ.setdefault("DATABRICKS_HOST", "http://databricks.test")
+os.environ.setdefault("DATABRICKS_TOKEN", "test")
+
+import mcp_databricks
+from mock_databricks import MockDatabricks, create_app
+
+
+@pytest.fixture(scope="session")
+def run():
+    """Run coroutines on one event loop, shared like the server's across tool calls"""
+    with asyncio.Runner() as runner:
+        yield runner.run
+
+
+@pytest.fixture
+def mock(monkeypatch):
+    """Point the default workspace at a fresh in-memory mock, recording the requests it receives
+
+    Caching and rate limiting are off, so every call reaches the mock without waiting.
+    """
+    mock = MockDatabricks(tree_depth=2, tree_width=2, notebooks_per_directory=2, repos=5, scopes=2, policies=0)
+    mock.requests = []
+    app = create_app(mock)
+
+    async def record(scope, receive, send):
+        if scope["type"] == "http":
+            mock.requests.append((scope["method"], scope["path"]))
+        await app(scope, receive, send)
+
+    client = httpx.AsyncClient(transport=httpx.ASGITransport(record), base_url="http://databricks.test")
+    monkeypatch.setattr(mcp_databricks.workspaces["default"], "client", client)
+    for family in mcp_databricks.cache.ttls:
+        monkeypatch.setitem(mcp_databricks.cache.ttls, family, 0)
+    for limiter in mcp_databricks.workspaces["default"].rate_limiters.values():
+        monkeypatch.setattr(limiter, "rate", 0)
+    return mock
+
+
+@pytest.fixture
+def upstream(monkeypatch):
+    """Answer the default workspace's requests with a handler instead of the mock
+
+    Returns a function installing `handler(request) -> httpx.Response`, which may be async,
+    and returning the list of requests it receives. Rate limiters are fresh and generous.
+    """
+    workspace = mcp_databricks.workspaces["default"]
+    limiters = {family: mcp_databricks.TokenBucket(1000, 1000) for family in mcp_databricks.rate_limits}
+    monkeypatch.setattr(workspace, "rate_limiters", limiters)
+
+    def install(handler):
+        received = []
+
+        async def record(request):
+            received.append(request)
+            response = handler(request)
+            return await response if inspect.isawaitable(response) else response
+
+        transport = httpx.MockTransport(record)
+        monkeypatch.setattr(workspace, "client", httpx.AsyncClient(transport=transport, base_url="http://databricks.test"))
+        return received
+
+    return install
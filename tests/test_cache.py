@@ -0,0 +1,79 @@
+import asyncio
+
+import httpx
+import pytest
+
+import mcp_databricks
+from mcp_databricks import ResponseCache, request
+
+
+@pytest.fixture
+def cache(monkeypatch):
+    cache = ResponseCache(2, {"repos": 60, "workspace": 60, "secret_scopes": 0})
+    monkeypatch.setattr(mcp_databricks, "cache", cache)
+    return cache
+
+
+def ok(request):
+    return httpx.Response(200, json={"path": request.url.path})
+
+
+def test_cached_responses_are_served_without_a_request(run, upstream, cache):
+    received = upstream(ok)
+    for _ in range(3):
+        assert run(request("GET", "/api/2.0/repos", cache_family="repos")).json() == {"path": "/api/2.0/repos"}
+    assert len(received) == 1
+    assert cache.stats()["hits"] == 2
+
+
+def test_failures_and_zero_ttls_are_not_cached(run, upstream, cache):
+    received = upstream(lambda request: httpx.Response(404, json={}) if "missing" in request.url.path else ok(request))
+    for _ in range(2):
+        run(request("GET", "/api/2.0/repos/missing", cache_family="repos"))
+        run(request("GET", "/api/2.0/secrets/scopes/list", cache_family="secret_scopes"))
+    assert len(received) == 4
+
+
+def test_writes_invalidate_their_families(run, upstream, cache):
+    received = upstream(ok)
+    run(request("GET", "/api/2.0/repos", cache_family="repos"))
+    run(request("GET", "/api/2.0/workspace/list", cache_family="workspace"))
+    run(request("POST", "/api/2.0/repos", json={}, invalidates=["repos"]))
+    run(request("GET", "/api/2.0/repos", cache_family="repos"))
+    run(request("GET", "/api/2.0/workspace/list", cache_family="workspace"))
+    assert [(request.method, request.url.path) for request in received] == [
+        ("GET", "/api/2.0/repos"), ("GET", "/api/2.0/workspace/list"), ("POST", "/api/2.0/repos"), ("GET", "/api/2.0/repos"),
+    ]
+
+
+def test_response_in_flight_during_a_write_is_not_cached(run, upstream, cache):
+    listed = asyncio.Event()
+    release = asyncio.Event()
+
+    async def slow_listing(request):
+        if request.method == "GET":
+            listed.set()
+            await release.wait()
+        return ok(request)
+
+    received = upstream(slow_listing)
+
+    async def write_while_listing():
+        listing = asyncio.ensure_future(request("GET", "/api/2.0/repos", cache_family="repos"))
+        await listed.wait()
+        await request("POST", "/api/2.0/repos", json={}, invalidates=["repos"])
+        release.set()
+        await listing
+        # the listing may predate the write, so it must not be served from the cache
+        await request("GET", "/api/2.0/repos", cache_family="repos")
+
+    run(write_while_listing())
+    assert [request.method for request in received] == ["GET", "POST", "GET"]
+
+
+def test_least_recently_used_entries_are_evicted(run, upstream, cache):
+    received = upstream(ok)
+    for path in ("/api/2.0/repos/1", "/api/2.0/repos/2", "/api/2.0/repos/1", "/api/2.0/repos/3", "/api/2.0/repos/1", "/api/2.0/repos/2"):
+        run(request("GET", path, cache_family="repos"))
+    assert [request.url.path for request in received] == ["/api/2.0/repos/1", "/api/2.0/repos/2", "/api/2.0/repos/3", "/api/2.0/repos/2"]
+    assert cache.stats()["evictions"] == 2
@@ -0,0 +1,114 @@
+import json
+
+import pytest
+
+from mcp_databricks import CompiledPolicy, evaluate_cluster_policy, flatten_spec, unflatten_spec
+
+
+def violations(definition, spec):
+    return {(violation["path"], violation["type"]) for violation in CompiledPolicy(definition).evaluate(flatten_spec(spec))["violations"]}
+
+
+def test_forbidden_object_forbids_its_subtree():
+    definition = {"aws_attributes": {"type": "forbidden"}}
+    assert violations(definition, {"aws_attributes": {"availability": "SPOT", "ebs_volume_count": 1}}) == {
+        ("aws_attributes.availability", "forbidden"),
+        ("aws_attributes.ebs_volume_count", "forbidden"),
+    }
+    assert violations(definition, {"azure_attributes": {"availability": "SPOT_AZURE"}}) == set()
+    # a sibling whose name starts the same is not below it
+    assert violations({"spark_conf": {"type": "forbidden"}}, {"spark_confs": "x"}) == set()
+
+
+def test_wildcard_paths_match_every_list_item():
+    definition = {
+        "init_scripts.*.volumes.destination": {"type": "regex", "pattern": "/Volumes/main/scripts/.*"},
+        "init_scripts.*.dbfs": {"type": "forbidden"},
+    }
+    spec = {"init_scripts": [
+        {"volumes": {"destination": "/Volumes/main/scripts/setup.sh"}},
+        {"volumes": {"destination": "/Volumes/other/setup.sh"}},
+        {"dbfs": {"destination": "dbfs:/setup.sh"}},
+    ]}
+    assert violations(definition, spec) == {
+        ("init_scripts.1.volumes.destination", "regex"),
+        ("init_scripts.2.dbfs.destination", "forbidden"),
+    }
+
+
+def test_required_attributes():
+    definition = {
+        "node_type_id": {"type": "allowlist", "values": ["m5.large"]},
+        "num_workers": {"type": "range", "maxValue": 10, "isOptional": True},
+        "autotermination_minutes": {"type": "range", "maxValue": 120, "defaultValue": 60},
+        "spark_version": {"type": "fixed", "value": "15.4.x-scala2.12"},
+        "dbus_per_hour": {"type": "range", "maxValue": 10},
+    }
+    result = CompiledPolicy(definition).evaluate({})
+    # neither optional nor defaulted attributes are required, fixed ones are set by the policy itself
+    assert result["violations"] == [{"path": "node_type_id", "type": "allowlist", "message": "node_type_id is required by the policy"}]
+    assert result["not_evaluated"] == ["dbus_per_hour"]
+    assert CompiledPolicy(definition).evaluate({"node_type_id": "m5.large"})["valid"]
+
+
+def test_values_are_compared_like_the_policy_api():
+    definition = {
+        "enable_elastic_disk": {"type": "fixed", "value": True},
+        "num_workers": {"type": "range", "minValue": 1, "maxValue": 4},
+        "node_type_id": {"type": "blocklist", "values": ["m5.24xlarge"]},
+    }
+    assert violations(definition, {"enable_elastic_disk": "true", "num_workers": "2", "node_type_id": "m5.large"}) == set()
+    assert violations(definition, {"enable_elastic_disk": False, "num_workers": 8, "node_type_id": "m5.24xlarge"}) == {
+        ("enable_elastic_disk", "fixed"), ("num_workers", "range"), ("node_type_id", "blocklist"),
+    }
+
+
+def test_fill_adds_fixed_and_default_values():
+    definition = {
+        "spark_version": {"type": "fixed", "value": "15.4.x-scala2.12"},
+        "autotermination_minutes": {"type": "range", "maxValue": 120, "defaultValue": 60},
+        "spark_conf.spark.databricks.cluster.profile": {"type": "fixed", "value": "singleNode"},
+        "custom_tags.team": {"type": "fixed", "value": "data"},
+        "dbus_per_hour": {"type": "range", "maxValue": 10, "defaultValue": 5},
+        "node_type_id": {"type": "allowlist", "values": ["m5.large"]},
+    }
+    policy = CompiledPolicy(definition)
+    filled = policy.fill(flatten_spec({"autotermination_minutes": 30, "node_type_id": "m5.large", "custom_tags": {"owner": "ops"}}))
+    assert policy.evaluate(filled)["valid"]
+    assert unflatten_spec(filled) == {
+        "autotermination_minutes": 30,
+        "node_type_id": "m5.large",
+        "spark_version": "15.4.x-scala2.12",
+        "spark_conf": {"spark.databricks.cluster.profile": "singleNode"},
+        "custom_tags": {"owner": "ops", "team": "data"},
+    }
+
+
+def test_flatten_and_unflatten_round_trip_lists():
+    spec = {"init_scripts": [{"volumes": {"destination": "/Volumes/a"}}, {"workspace": {"destination": "/b"}}], "num_workers": 2}
+    assert flatten_spec(spec) == {
+        "init_scripts.0.volumes.destination": "/Volumes/a",
+        "init_scripts.1.workspace.destination": "/b",
+        "num_workers": 2,
+    }
+    assert unflatten_spec(flatten_spec(spec)) == spec
+
+
+def test_evaluate_cluster_policy_checks_the_policies_of_the_workspace(run, mock):
+    mock.policies["ABC"] = {"policy_id": "ABC", "name": "small", "definition": json.dumps({
+        "node_type_id": {"type": "allowlist", "values": ["m5.large"]},
+        "spark_version": {"type": "fixed", "value": "15.4.x-scala2.12"},
+    })}
+    mock.policies["DEF"] = {"policy_id": "DEF", "name": "large", "definition": json.dumps({
+        "node_type_id": {"type": "allowlist", "values": ["m5.4xlarge"]},
+    })}
+    result = json.loads(run(evaluate_cluster_policy({"node_type_id": "m5.large"}, fill=True)))["policies"]
+    # valid policies come first
+    assert [(policy["policy_id"], policy["valid"]) for policy in result] == [("ABC", True), ("DEF", False)]
+    assert result[0]["cluster_spec"] == {"node_type_id": "m5.large", "spark_version": "15.4.x-scala2.12"}
+    assert ("GET", "/api/2.0/policies/clusters/list") in mock.requests
+
+    result = json.loads(run(evaluate_cluster_policy({"node_type_id": "m5.large"}, policy_id="DEF")))["policies"]
+    assert [policy["policy_id"] for policy in result] == ["DEF"]
+    with pytest.raises(ValueError):
+        run(evaluate_cluster_policy({}, policy_id="missing"))
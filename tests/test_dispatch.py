@@ -0,0 +1,117 @@
+import time
+
+import httpx
+import pytest
+
+import mcp_databricks
+from mcp_databricks import retry_after_seconds, send
+
+
+@pytest.fixture(autouse=True)
+def quick_retries(monkeypatch):
+    monkeypatch.setattr(mcp_databricks, "max_retries", 3)
+    monkeypatch.setattr(mcp_databricks, "retry_backoff", 0.001)
+    monkeypatch.setattr(mcp_databricks, "retry_max_backoff", 0.2)
+
+
+def responses(*answers):
+    """Handler answering with each (status, headers) in turn, then 200"""
+    answers = list(answers)
+
+    def handler(request):
+        if not answers:
+            return httpx.Response(200, json={})
+        status, headers = answers.pop(0)
+        return httpx.Response(status, headers=headers, json={"error_code": "REQUEST_LIMIT_EXCEEDED"})
+
+    return handler
+
+
+def limiter(family):
+    return mcp_databricks.workspaces["default"].rate_limiters[family]
+
+
+def test_retry_after_is_honoured(run, upstream):
+    received = upstream(responses((429, {"Retry-After": "0.1"})))
+    start = time.monotonic()
+    response = run(send("GET", "/api/2.0/secrets/scopes/list"))
+    assert response.status_code == 200
+    assert len(received) == 2
+    assert time.monotonic() - start >= 0.1
+
+
+def test_retry_after_beyond_the_cap_is_returned(run, upstream):
+    received = upstream(responses((429, {"Retry-After": "3600"})))
+    start = time.monotonic()
+    response = run(send("GET", "/api/2.0/secrets/scopes/list"))
+    assert response.status_code == 429
+    assert len(received) == 1
+    # the family is held for the cap, not for an hour
+    assert limiter("secrets").paused_until <= start + 0.2 + 0.05
+
+
+def test_429_pauses_the_whole_family(run, upstream):
+    received = upstream(lambda request: (
+        httpx.Response(429, headers={"Retry-After": "0.15"}, json={}) if request.url.path.endswith("/create") else httpx.Response(200, json={})
+    ))
+
+    async def throttled_then_others():
+        await send("POST", "/api/2.0/secrets/scopes/create", json={"scope": "x"})
+        start = time.monotonic()
+        await send("GET", "/api/2.0/repos")
+        other_family = time.monotonic() - start
+        await send("GET", "/api/2.0/secrets/scopes/list")
+        return other_family, time.monotonic() - start
+
+    other_family, same_family = run(throttled_then_others())
+    assert other_family < 0.1
+    assert same_family >= 0.14
+    assert [request.method for request in received] == ["POST", "GET", "GET"]
+
+
+@pytest.mark.parametrize("status", [429, 503])
+def test_post_is_never_retried(run, upstream, status):
+    received = upstream(responses((status, {"Retry-After": "0"})))
+    response = run(send("POST", "/api/2.0/workspace/mkdirs", json={"path": "/x"}))
+    assert response.status_code == status
+    assert len(received) == 1
+
+
+def test_post_transport_errors_are_raised(run, upstream):
+    def fail(request):
+        raise httpx.ConnectError("refused", request=request)
+
+    received = upstream(fail)
+    with pytest.raises(httpx.ConnectError):
+        run(send("POST", "/api/2.0/workspace/mkdirs", json={"path": "/x"}))
+    assert len(received) == 1
+
+
+def test_get_gives_up_after_max_retries(run, upstream):
+    received = upstream(responses(*[(503, {})] * 10))
+    assert run(send("GET", "/api/2.0/workspace/list")).status_code == 503
+    assert len(received) == 4
+
+
+def test_get_transport_errors_are_retried(run, upstream):
+    attempts = []
+
+    def flaky(request):
+        attempts.append(request)
+        if len(attempts) < 3:
+            raise httpx.ReadError("reset", request=request)
+        return httpx.Response(200, json={})
+
+    upstream(flaky)
+    assert run(send("GET", "/api/2.0/workspace/list")).status_code == 200
+    assert len(attempts) == 3
+
+
+@pytest.mark.parametrize("value, expected", [
+    ("2", 2.0),
+    ("-5", 0.0),
+    ("Thu, 01 Jan 1970 00:00:00 GMT", 0.0),
+    ("soon", None),
+])
+def test_retry_after_values(value, expected):
+    assert retry_after_seconds(httpx.Response(429, headers={"Retry-After": value})) == expected
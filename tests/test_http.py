@@ -0,0 +1,38 @@
+import httpx
+import pytest
+
+import mcp_databricks
+
+
+def get(path, headers=None):
+    async def call():
+        app = mcp_databricks.mcp.http_app(transport="http")
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app), base_url="http://server.test") as client:
+            return await client.get(path, headers=headers)
+    return call()
+
+
+@pytest.mark.parametrize("headers, status", [
+    (None, 401),
+    ({"Authorization": "Bearer wrong"}, 401),
+    ({"Authorization": "Basic c2VjcmV0"}, 401),
+    ({"Authorization": "Bearer secret"}, 200),
+])
+def test_metrics_require_the_token(run, monkeypatch, headers, status):
+    monkeypatch.setattr(mcp_databricks, "server_token", "secret")
+    assert run(get("/metrics", headers)).status_code == status
+
+
+def test_metrics_are_open_without_a_token(run, monkeypatch):
+    monkeypatch.setattr(mcp_databricks, "server_token", None)
+    assert run(get("/metrics")).status_code == 200
+
+
+def test_health_is_open(run, monkeypatch):
+    monkeypatch.setattr(mcp_databricks, "server_token", "secret")
+    assert run(get("/health")).text == "ok"
+
+
+@pytest.mark.parametrize("host, loopback", [("127.0.0.1", True), ("::1", True), ("localhost", True), ("0.0.0.0", False), ("10.0.0.5", False)])
+def test_loopback_hosts(host, loopback):
+    assert mcp_databricks.is_loopback(host) is loopback
@@ -0,0 +1,85 @@
+import base64
+import json
+
+import httpx
+import pytest
+
+from mcp_databricks import decode_cursor, encode_cursor, get_repos, list_pages
+
+items = [{"id": index} for index in range(10)]
+
+
+def pages_of(size):
+    """Handler serving `items` in pages of `size`, with the offset as the page token"""
+    def handler(request):
+        start = int(request.url.params.get("next_page_token") or 0)
+        page = {"items": items[start:start + size]}
+        if start + size < len(items):
+            page["next_page_token"] = str(start + size)
+        return httpx.Response(200, json=page)
+
+    return handler
+
+
+@pytest.mark.parametrize("limit", [1, 3, 4, 5, 9, 10])
+def test_cursors_continue_where_the_previous_call_stopped(run, upstream, limit):
+    upstream(pages_of(4))
+    collected, cursor, calls = [], None, 0
+    while True:
+        result = run(list_pages("/api/2.0/items", "items", limit=limit, cursor=cursor))
+        calls += 1
+        assert len(result["items"]) <= limit
+        collected.extend(result["items"])
+        cursor = result.get("next_cursor")
+        if cursor is None:
+            break
+    assert collected == items
+    assert calls == -(-len(items) // limit)
+
+
+def test_cursor_inside_and_at_the_end_of_a_page(run, upstream):
+    upstream(pages_of(4))
+    # 3 of the first page's 4 items leaves the cursor on that page
+    assert decode_cursor(run(list_pages("/api/2.0/items", "items", limit=3))["next_cursor"]) == (None, 3)
+    # a whole page moves the cursor to the start of the next one
+    assert decode_cursor(run(list_pages("/api/2.0/items", "items", limit=4))["next_cursor"]) == ("4", 0)
+
+
+def test_no_limit_reads_every_page(run, upstream):
+    received = upstream(pages_of(4))
+    assert run(list_pages("/api/2.0/items", "items")) == {"items": items}
+    assert len(received) == 3
+
+
+def test_failing_page_is_returned(run, upstream):
+    upstream(lambda request: httpx.Response(403, json={"error_code": "PERMISSION_DENIED"}))
+    assert run(list_pages("/api/2.0/items", "items", limit=2)).status_code == 403
+
+
+@pytest.mark.parametrize("cursor", [
+    "garbage",
+    base64.urlsafe_b64encode(b'"x"').decode(),
+    base64.urlsafe_b64encode(b"[null, -1]").decode(),
+    base64.urlsafe_b64encode(b"[1, 0]").decode(),
+    base64.urlsafe_b64encode(b"[null, true]").decode(),
+])
+def test_invalid_cursors_are_rejected(cursor):
+    with pytest.raises(ValueError, match="Invalid cursor"):
+        decode_cursor(cursor)
+
+
+def test_negative_limit_is_rejected(run):
+    with pytest.raises(ValueError, match="limit"):
+        run(list_pages("/api/2.0/items", "items", limit=-1))
+
+
+def test_cursor_round_trip():
+    assert decode_cursor(encode_cursor("abc", 7)) == ("abc", 7)
+
+
+def test_get_repos_pages_through_every_repo(run, mock):
+    result = json.loads(run(get_repos(limit=3)))
+    assert len(result["repos"]) == 3
+    rest = json.loads(run(get_repos(cursor=result["next_cursor"])))
+    assert "next_cursor" not in rest
+    assert [repo["id"] for repo in result["repos"] + rest["repos"]] == sorted(mock.repos)
@@ -0,0 +1,153 @@
+import json
+
+import fastmcp
+import pytest
+from fastmcp.exceptions import ToolError
+
+from mcp_databricks import (
+    AccessControlEntry, PermissionTarget, get_permissions_batch, mcp, reconcile_acl, reconcile_permissions, set_cluster_policy_permissions,
+)
+
+admins = ("group_name", "admins")
+alice = ("user_name", "alice@example.com")
+bob = ("user_name", "bob@example.com")
+
+
+def notebook(mock, path="/Users/notebook_0"):
+    """Give a notebook of the mock an inherited admins entry and a direct CAN_READ for alice"""
+    object_id = str(mock.objects[path]["object_id"])
+    mock.acls[f"notebooks/{object_id}"] = {admins: ("CAN_MANAGE", True), alice: ("CAN_READ", False)}
+    return object_id
+
+
+def writes(mock):
+    return [(method, path) for method, path in mock.requests if method in ("PUT", "PATCH")]
+
+
+def test_matching_acl_is_not_written(run, mock):
+    object_id = notebook(mock)
+    report = run(reconcile_acl("notebooks", object_id, [AccessControlEntry(user_name="alice@example.com", permission_level="CAN_READ")]))
+    assert report["action"] == "unchanged"
+    assert writes(mock) == []
+
+
+def test_inherited_entries_are_left_alone(run, mock):
+    object_id = notebook(mock)
+    # admins is inherited, so leaving it out of the desired ACL is no reason to PUT
+    desired = [AccessControlEntry(user_name="alice@example.com", permission_level="CAN_READ")]
+    assert run(reconcile_acl("notebooks", object_id, desired))["action"] == "unchanged"
+    # and asking for its inherited level directly is a change to make
+    desired.append(AccessControlEntry(group_name="admins", permission_level="CAN_MANAGE"))
+    report = run(reconcile_acl("notebooks", object_id, desired))
+    assert report["action"] == "patch"
+    assert report["changes"] == [{"principal_type": "group", "principal": "admins", "from": None, "to": "CAN_MANAGE"}]
+
+
+def test_added_and_changed_entries_are_patched(run, mock):
+    object_id = notebook(mock)
+    desired = [
+        AccessControlEntry(user_name="alice@example.com", permission_level="CAN_EDIT"),
+        AccessControlEntry(user_name="bob@example.com", permission_level="CAN_RUN"),
+    ]
+    report = run(reconcile_acl("notebooks", object_id, desired))
+    assert report["action"] == "patch"
+    assert {(change["principal"], change["from"], change["to"]) for change in report["changes"]} == {
+        ("alice@example.com", "CAN_READ", "CAN_EDIT"),
+        ("bob@example.com", None, "CAN_RUN"),
+    }
+    assert writes(mock) == [("PATCH", f"/api/2.0/permissions/notebooks/{object_id}")]
+    assert mock.acls[f"notebooks/{object_id}"] == {
+        admins: ("CAN_MANAGE", True), alice: ("CAN_EDIT", False), bob: ("CAN_RUN", False),
+    }
+
+
+def test_removed_entries_are_put(run, mock):
+    object_id = notebook(mock)
+    report = run(reconcile_acl("notebooks", object_id, [AccessControlEntry(user_name="bob@example.com", permission_level="CAN_RUN")]))
+    assert report["action"] == "put"
+    assert {(change["principal"], change["from"], change["to"]) for change in report["changes"]} == {
+        ("bob@example.com", None, "CAN_RUN"),
+        ("alice@example.com", "CAN_READ", None),
+    }
+    assert writes(mock) == [("PUT", f"/api/2.0/permissions/notebooks/{object_id}")]
+    assert mock.acls[f"notebooks/{object_id}"] == {admins: ("CAN_MANAGE", True), bob: ("CAN_RUN", False)}
+
+
+def test_dry_run_reports_without_writing(run, mock):
+    object_id = notebook(mock)
+    report = run(reconcile_acl("notebooks", object_id, [], dry_run=True))
+    assert report["action"] == "put"
+    assert report["changes"] == [{"principal_type": "user", "principal": "alice@example.com", "from": "CAN_READ", "to": None}]
+    assert writes(mock) == []
+    assert mock.acls[f"notebooks/{object_id}"][alice] == ("CAN_READ", False)
+
+
+def test_cluster_policy_grants_are_reconciled(run, mock):
+    mock.acls["cluster-policies/ABC"] = {admins: ("CAN_MANAGE", True), alice: ("CAN_USE", False)}
+    desired = [{"user_name": "alice@example.com", "permission_level": "CAN_USE"}]
+    report = json.loads(run(set_cluster_policy_permissions("ABC", [AccessControlEntry(**entry) for entry in desired], reconcile=True)))
+    assert report["action"] == "unchanged"
+    desired.append({"user_name": "bob@example.com", "permission_level": "CAN_USE"})
+    report = json.loads(run(set_cluster_policy_permissions("ABC", [AccessControlEntry(**entry) for entry in desired], reconcile=True)))
+    assert report["action"] == "patch"
+    assert mock.acls["cluster-policies/ABC"] == {admins: ("CAN_MANAGE", True), alice: ("CAN_USE", False), bob: ("CAN_USE", False)}
+
+
+def test_reconcile_permissions_only_writes_objects_that_differ(run, mock):
+    up_to_date = notebook(mock, "/Users/folder_0/notebook_0")
+    result = json.loads(run(reconcile_permissions(
+        [AccessControlEntry(user_name="alice@example.com", permission_level="CAN_READ")],
+        objects=[PermissionTarget(object_type="notebooks", object_id=up_to_date)],
+        path_prefix="/Users/folder_0",
+    )))
+    # the folder and its second notebook get alice, the first notebook is reconciled twice and left alone
+    assert result["summary"] == {"unchanged": 2, "patch": 2, "put": 0, "error": 0}
+    assert {report["path"] for report in result["objects"]} == {"/Users/folder_0", "/Users/folder_0/notebook_1"}
+    assert len(writes(mock)) == 2
+    assert all(path != f"/api/2.0/permissions/notebooks/{up_to_date}" for _, path in writes(mock))
+
+
+def test_reconcile_permissions_dry_run_writes_nothing(run, mock):
+    result = json.loads(run(reconcile_permissions(
+        [AccessControlEntry(user_name="alice@example.com", permission_level="CAN_READ")],
+        path_prefix="/Users/folder_1",
+        dry_run=True,
+    )))
+    assert result["dry_run"] is True
+    assert result["summary"]["patch"] == 3
+    assert writes(mock) == []
+
+
+def test_permissions_batch_of_a_subtree(run, mock):
+    notebook(mock, "/Users/folder_0/notebook_0")
+    table = json.loads(run(get_permissions_batch(path_prefix="/Users/folder_0")))
+    rows = [dict(zip(table["columns"], row)) for row in table["rows"]]
+    assert {row["path"] for row in rows} == {"/Users/folder_0", "/Users/folder_0/notebook_0", "/Users/folder_0/notebook_1"}
+    assert [(row["path"], row["permission_level"], row["inherited"]) for row in rows if row["principal"] == "alice@example.com"] == [
+        ("/Users/folder_0/notebook_0", "CAN_READ", False),
+    ]
+    assert table["errors"] == []
+
+
+def test_path_prefix_without_permissions_is_refused(run, mock):
+    mock.add_object("/Users/library", "LIBRARY")
+    with pytest.raises(ValueError, match="LIBRARY"):
+        run(get_permissions_batch(path_prefix="/Users/library"))
+
+
+def test_permissions_batch_concurrency_must_be_positive(run):
+    async def call():
+        async with fastmcp.Client(mcp) as client:
+            await client.call_tool("get_permissions_batch", {"path_prefix": "/Users", "concurrency": 0})
+
+    with pytest.raises(ToolError, match="minimum of 1"):
+        run(call())
+
+
+def test_reconcile_concurrency_must_be_positive(run):
+    async def call():
+        async with fastmcp.Client(mcp) as client:
+            await client.call_tool("reconcile_permissions", {"access_control_list": [], "path_prefix": "/Users", "concurrency": 0})
+
+    with pytest.raises(ToolError, match="minimum of 1"):
+        run(call())
@@ -0,0 +1,23 @@
+import json
+
+import fastmcp
+import pytest
+from fastmcp.exceptions import ToolError
+
+from mcp_databricks import get_secret_inventory, mcp
+
+
+def test_secret_inventory_reads_every_scope(run, mock):
+    inventory = json.loads(run(get_secret_inventory(concurrency=1)))
+    assert len(inventory["scopes"]) == 2
+    assert all(scope["key_count"] == 10 for scope in inventory["scopes"])
+    assert inventory["errors"] == []
+
+
+def test_secret_inventory_concurrency_must_be_positive(run):
+    async def call():
+        async with fastmcp.Client(mcp) as client:
+            await client.call_tool("get_secret_inventory", {"concurrency": 0})
+
+    with pytest.raises(ToolError, match="minimum of 1"):
+        run(call())
@@ -0,0 +1,119 @@
+import base64
+import json
+from collections import deque
+from contextlib import aclosing
+
+import fastmcp
+import pytest
+from fastmcp.exceptions import ToolError
+
+from mcp_databricks import decode_walk_cursor, import_workspace_directory, list_workspace_objects_recursive, mcp, walk_workspace
+
+
+def walk_pages(run, limit, **arguments):
+    """Page through list_workspace_objects_recursive, returning the objects of each page"""
+    pages, cursor = [], None
+    while True:
+        lines = run(list_workspace_objects_recursive(limit=limit, cursor=cursor, **arguments)).splitlines()
+        cursor = json.loads(lines.pop())["next_cursor"] if lines and "next_cursor" in lines[-1] else None
+        pages.append([json.loads(line)["path"] for line in lines])
+        if cursor is None:
+            return pages
+
+
+@pytest.mark.parametrize("max_depth", [None, 1, 2])
+@pytest.mark.parametrize("limit", [1, 2, 3, 5, 8])
+def test_paging_returns_every_object_once(run, mock, limit, max_depth):
+    everything = [json.loads(line)["path"] for line in run(list_workspace_objects_recursive("/", max_depth=max_depth)).splitlines()]
+    assert len(everything) == len(set(everything))
+    pages = walk_pages(run, limit, path="/", max_depth=max_depth)
+    paged = [path for page in pages for path in page]
+    assert len(paged) == len(set(paged))
+    assert set(paged) == set(everything)
+    # only the last page is short, it is empty when the directories left to list turn out to be
+    assert all(len(page) == limit for page in pages[:-1])
+    assert len(pages[-1]) <= limit
+
+
+def test_cursor_resumes_inside_a_directory(run, mock):
+    lines = run(list_workspace_objects_recursive("/Users", max_depth=1, limit=1)).splitlines()
+    pending = decode_walk_cursor(json.loads(lines[-1])["next_cursor"])
+    # /Users was listed and descended into, only its remaining objects are left
+    assert list(pending) == [["/Users", 1, 1]]
+
+
+def test_unlimited_listing_has_no_cursor(run, mock):
+    lines = run(list_workspace_objects_recursive("/Users", limit=1000)).splitlines()
+    assert not any("next_cursor" in line for line in lines)
+
+
+def test_zero_limit_returns_the_starting_cursor(run, mock):
+    lines = run(list_workspace_objects_recursive("/Users", limit=0)).splitlines()
+    assert len(lines) == 1
+    assert list(decode_walk_cursor(json.loads(lines[0])["next_cursor"])) == [["/Users", 1, None]]
+
+
+def test_closed_walk_puts_directories_in_flight_back(run, mock):
+    async def first_then_rest():
+        pending = deque([["/Users", 1, None]])
+        async with aclosing(walk_workspace("/Users", concurrency=4, pending=pending)) as listings:
+            async for (directory, _, _), objects in listings:
+                first = [directory]
+                break
+        # /Users queued both folders before yielding, they are back on pending
+        assert sorted(entry[0] for entry in pending) == ["/Users/folder_0", "/Users/folder_1"]
+        async with aclosing(walk_workspace("/Users", pending=pending)) as listings:
+            rest = [directory async for (directory, _, _), _ in listings]
+        return first, rest, pending
+
+    first, rest, pending = run(first_then_rest())
+    assert first == ["/Users"]
+    assert sorted(rest) == ["/Users/folder_0", "/Users/folder_1"]
+    assert not pending
+
+
+@pytest.mark.parametrize("cursor", [
+    "garbage",
+    base64.urlsafe_b64encode(b'"x"').decode(),
+    base64.urlsafe_b64encode(b'[["/a", 0, null]]').decode(),
+    base64.urlsafe_b64encode(b'[["/a", 1, -1]]').decode(),
+    base64.urlsafe_b64encode(b'[["/a", 1]]').decode(),
+])
+def test_invalid_cursors_are_rejected(cursor):
+    with pytest.raises(ValueError, match="Invalid cursor"):
+        decode_walk_cursor(cursor)
+
+
+@pytest.mark.parametrize("tool_name", ["list_workspace_objects_recursive", "refresh_workspace_index"])
+def test_concurrency_must_be_positive(run, tool_name):
+    async def call():
+        async with fastmcp.Client(mcp) as client:
+            await client.call_tool(tool_name, {"path": "/", "concurrency": 0})
+
+    with pytest.raises(ToolError, match="minimum of 1"):
+        run(call())
+
+
+def test_directory_import_keeps_existing_objects_by_default(run, mock, tmp_path):
+    (tmp_path / "notebook_0.py").write_text("# Databricks notebook source\nprint(1)\n")
+    (tmp_path / "new.py").write_text("# Databricks notebook source\nprint(2)\n")
+    result = json.loads(run(import_workspace_directory(str(tmp_path), "/Users")))
+    assert result["transferred"] == 1
+    assert [failure["path"] for failure in result["failed"]] == ["notebook_0.py"]
+    assert "/Users/new" in mock.objects
+    # new.py is unchanged since the first import and skipped
+    result = json.loads(run(import_workspace_directory(str(tmp_path), "/Users", overwrite=True)))
+    assert (result["transferred"], result["skipped"], result["failed"]) == (1, 1, [])
+
+
+@pytest.mark.parametrize("tool_name, arguments", [
+    ("export_workspace_directory", {"path": "/Users", "local_dir": "out"}),
+    ("import_workspace_directory", {"path": "/Users", "local_dir": "in"}),
+])
+def test_transfer_concurrency_must_be_positive(run, tool_name, arguments):
+    async def call():
+        async with fastmcp.Client(mcp) as client:
+            await client.call_tool(tool_name, {**arguments, "concurrency": 0})
+
+    with pytest.raises(ToolError, match="minimum of 1"):
+        run(call())
@@ -0,0 +1,19 @@
+import json
+
+import fastmcp
+
+import mcp_databricks
+
+
+def test_rate_limit_stats_cover_every_workspace(run, monkeypatch):
+    monkeypatch.setitem(mcp_databricks.workspaces, "prod", mcp_databricks.Workspace("prod", "http://prod.test", "prod-token"))
+    mcp_databricks.workspaces["prod"].rate_limiters["secrets"].waits = 3
+
+    async def read():
+        async with fastmcp.Client(mcp_databricks.mcp) as client:
+            return json.loads((await client.read_resource("databricks://stats/rate_limits"))[0].text)
+
+    stats = run(read())
+    assert set(stats) == {"default", "prod"}
+    assert stats["prod"]["secrets"]["waits"] == 3
+    assert stats["default"].keys() == mcp_databricks.rate_limits.keys()